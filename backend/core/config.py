@@ -21,14 +21,69 @@ class Settings(BaseSettings):
         "http://127.0.0.1:5173"
     ]
     
+    # Logging (JSON lines via a background writer thread)
+    LOG_LEVEL: str = "INFO"
+    LOG_QUEUE_SIZE: int = 10000  # Records beyond this are dropped rather than blocking
+    LOG_SAMPLE_BURST: int = 10  # Identical messages per route allowed per window
+    LOG_SAMPLE_WINDOW_SECONDS: float = 60.0
+    LOG_DROP_REPORT_SECONDS: float = 10.0  # How often the writer reports records dropped on a full queue
+    
     # Supabase
     SUPABASE_URL: str
     SUPABASE_KEY: str
     SUPABASE_SERVICE_KEY: str
     
+    # Supabase read replicas (empty list = every read goes to the primary)
+    SUPABASE_REPLICA_URLS: List[str] = []
+    READ_YOUR_WRITES_SECONDS: float = 5.0  # Pin a user's reads to primary after a write
+    REPLICA_RETRY_SECONDS: float = 30.0  # Keep a failed replica out of rotation this long
+    
     # MCP Configuration
     MCP_SERVER_URL: str = "http://localhost:8080"
     
+    # Bet settlement (per-user group commit)
+    BET_SETTLEMENT_SHARDS: int = 8
+    BET_SETTLEMENT_WINDOW_MS: float = 2.0  # How long a shard waits to batch more bets
+    BET_SETTLEMENT_MAX_BATCH: int = 50
+    
+    # Betting anomaly detection (flags only; bets are never blocked)
+    ANOMALY_DETECTION_ENABLED: bool = True
+    ANOMALY_BURST_RATE_PER_SECOND: float = 1.0  # Sustained per-user bet rate that counts as a burst
+    ANOMALY_RATE_WINDOW_SECONDS: float = 30.0  # EWMA time constant for the bet rate
+    ANOMALY_HIGH_STAKE: float = 500.0
+    ANOMALY_HOT_USER_BETS: int = 300  # Bets per user across the last two windows
+    ANOMALY_WINDOW_SECONDS: float = 60.0
+    # X-Admin-Token value that unlocks /admin/anomalies; separate from PROFILER_TOKEN
+    # so profiling access does not expose user data (set both to share one secret)
+    ADMIN_TOKEN: str = ""
+    
+    # Payments
+    PAYMENT_GATEWAY: str = "fake"  # Adapter name, see services/payment_gateway.py
+    PAYMENT_WORKERS: int = 4
+    PAYMENT_QUEUE_SIZE: int = 1000  # Requests beyond this get 503 instead of queueing
+    PAYMENT_MAX_AMOUNT: float = 10000.0  # Per deposit/withdrawal
+    PAYMENT_GATEWAY_TIMEOUT_SECONDS: float = 30.0
+    PAYMENT_CREDIT_BATCH_SECONDS: float = 0.5  # Window for batching webhook credits
+    PAYMENT_RECOVERY_AGE_SECONDS: float = 300.0  # Jobs idle this long are resumed or flagged for reconciliation
+    PAYMENT_WEBHOOK_SECRET: str = ""  # HMAC key for gateway callbacks; empty disables the endpoint
+    FAKE_GATEWAY_LATENCY_SECONDS: float = 2.0
+    FAKE_GATEWAY_FAILURE_RATE: float = 0.1
+    
+    # Request profiling (disabled when sample rate is 0 and no token is set)
+    PROFILER_SAMPLE_RATE: float = 0.0  # Fraction of requests to profile
+    PROFILER_TOKEN: str = ""  # X-Profile-Token value that forces profiling and unlocks /admin/profiles
+    PROFILER_INTERVAL_MS: float = 5.0
+    PROFILER_BUFFER_SIZE: int = 20  # Profiles kept per route
+    
+    # Adaptive concurrency limit and load shedding
+    LOAD_SHEDDING_ENABLED: bool = True
+    CONCURRENCY_INITIAL_LIMIT: int = 20
+    CONCURRENCY_MIN_LIMIT: int = 4
+    CONCURRENCY_MAX_LIMIT: int = 200
+    CONCURRENCY_LATENCY_TOLERANCE: float = 2.0  # Window p90 over no-load latency x this shrinks the limit
+    CONCURRENCY_WINDOW_SECONDS: float = 1.0  # The limit changes at most once per window
+    LOAD_SHED_RETRY_AFTER_SECONDS: int = 1
+    
     # Database
     DATABASE_URL: str = ""
     
@@ -0,0 +1,180 @@
+import json
+import math
+import time
+from typing import Dict, List, Optional
+from core.config import settings
+
+# Priority classes: lower number = more important
+PRIORITY_CRITICAL = 0  # Health checks, never shed
+PRIORITY_NORMAL = 1  # Balance, bets, payments
+PRIORITY_LOW = 2  # Login and registration (bcrypt-heavy)
+
+# Fraction of the current limit each class may fill before it is shed
+PRIORITY_SHARE = {
+    PRIORITY_NORMAL: 1.0,
+    PRIORITY_LOW: 0.6,
+}
+
+CRITICAL_PATHS = ("/", "/health")
+LOW_PRIORITY_PREFIXES = ("/auth",)
+
+def classify(path: str) -> int:
+    """Map a request path to its priority class"""
+    if path.startswith("/api/"):
+        path = path[4:]
+
+    if path in CRITICAL_PATHS:
+        return PRIORITY_CRITICAL
+    if path.startswith(LOW_PRIORITY_PREFIXES):
+        return PRIORITY_LOW
+    return PRIORITY_NORMAL
+
+class AdaptiveLimiter:
+    """
+    Gradient concurrency limit driven by latency.
+    Latencies are collected per priority class (bcrypt logins are always
+    slower than balance reads) over a fixed window. At the end of each window
+    the class's p90 is compared to its no-load estimate, the lowest window p90
+    seen, drifting slowly upwards so it can follow a genuinely slower backend:
+
+        gradient = min(1, tolerance * rtt_noload / rtt_p90)
+
+    The limit only moves when it was the constraint during the window (in-flight
+    reached it or something was shed); an idle pod keeps its limit however noisy
+    individual requests are. A saturated window with gradient 1 grows the limit
+    by sqrt(limit); otherwise it becomes limit * gradient, never cut by more
+    than half per window.
+    """
+
+    def __init__(
+        self,
+        initial_limit: int,
+        min_limit: int,
+        max_limit: int,
+        tolerance: float,
+        window_seconds: float = 1.0,
+        min_samples: int = 10,
+        max_samples: int = 1000
+    ):
+        self.limit = float(initial_limit)
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.tolerance = tolerance
+        self.window_seconds = window_seconds
+        self.min_samples = min_samples
+        self.max_samples = max_samples
+        self.in_flight = 0
+        self.noload: Dict[int, float] = {}
+        self.shed_count = 0
+        self._samples: Dict[int, List[float]] = {}
+        self._sample_count = 0
+        self._window_start: Optional[float] = None
+        self._saturated = False
+
+    def try_acquire(self, priority: int) -> bool:
+        if self.in_flight >= self.limit * PRIORITY_SHARE[priority]:
+            self.shed_count += 1
+            self._saturated = True
+            return False
+
+        self.in_flight += 1
+        if self.in_flight >= self.limit:
+            self._saturated = True
+        return True
+
+    def release(self, priority: int, latency: float, now: Optional[float] = None) -> None:
+        self.in_flight -= 1
+
+        if now is None:
+            now = time.monotonic()
+        if self._window_start is None:
+            self._window_start = now
+
+        samples = self._samples.setdefault(priority, [])
+        if len(samples) < self.max_samples:
+            samples.append(latency)
+        self._sample_count += 1
+
+        if now - self._window_start >= self.window_seconds and self._sample_count >= self.min_samples:
+            self._update_limit()
+            self._samples = {}
+            self._sample_count = 0
+            self._window_start = now
+            self._saturated = False
+
+    def _update_limit(self) -> None:
+        gradient = 1.0
+
+        for priority, samples in self._samples.items():
+            samples.sort()
+            p90 = samples[int(0.9 * (len(samples) - 1))]
+
+            noload = self.noload.get(priority)
+            if noload is None or p90 < noload:
+                noload = p90
+            else:
+                noload += (p90 - noload) * 0.05
+            self.noload[priority] = noload
+
+            if p90 > 0:
+                gradient = min(gradient, self.tolerance * noload / p90)
+
+        # Only move the limit when it was actually holding requests back
+        if not self._saturated:
+            return
+
+        if gradient >= 1.0:
+            self.limit = min(self.max_limit, self.limit + math.sqrt(self.limit))
+        else:
+            self.limit = max(self.min_limit, self.limit * max(gradient, 0.5))
+
+class LoadSheddingMiddleware:
+    """
+    ASGI middleware that admits requests under the adaptive limit by priority
+    and answers the rest with 503 and Retry-After before any work is done.
+    """
+
+    def __init__(self, app, limiter: AdaptiveLimiter, retry_after: int):
+        self.app = app
+        self.limiter = limiter
+        self.retry_after = retry_after
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        priority = classify(scope["path"])
+
+        # CORS preflights are answered by CORSMiddleware without touching the app
+        if priority == PRIORITY_CRITICAL or scope["method"] == "OPTIONS":
+            await self.app(scope, receive, send)
+            return
+
+        if not self.limiter.try_acquire(priority):
+            await self._reject(send)
+            return
+
+        started = time.monotonic()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            self.limiter.release(priority, time.monotonic() - started)
+
+    async def _reject(self, send):
+        body = json.dumps({"detail": "Server is busy, please retry shortly"}).encode()
+        headers = [
+            (b"content-type", b"application/json"),
+            (b"content-length", str(len(body)).encode()),
+            (b"retry-after", str(self.retry_after).encode()),
+        ]
+        await send({"type": "http.response.start", "status": 503, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+limiter = AdaptiveLimiter(
+    initial_limit=settings.CONCURRENCY_INITIAL_LIMIT,
+    min_limit=settings.CONCURRENCY_MIN_LIMIT,
+    max_limit=settings.CONCURRENCY_MAX_LIMIT,
+    tolerance=settings.CONCURRENCY_LATENCY_TOLERANCE,
+    window_seconds=settings.CONCURRENCY_WINDOW_SECONDS
+)
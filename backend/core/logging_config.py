@@ -0,0 +1,245 @@
+import copy
+import json
+import logging
+import logging.handlers
+import queue
+import sys
+import threading
+import time
+import uuid
+from contextvars import ContextVar
+from datetime import datetime, timezone
+from typing import Dict, Optional, Tuple
+from core.config import settings
+
+# ASGI scope of the request being handled; the router fills in scope["route"]
+# after matching, so the route template is available to anything logged later
+request_scope: ContextVar[Optional[dict]] = ContextVar("request_scope", default=None)
+request_id: ContextVar[Optional[str]] = ContextVar("request_id", default=None)
+
+_listener: Optional[logging.handlers.QueueListener] = None
+
+UVICORN_LOGGERS = ("uvicorn", "uvicorn.access", "uvicorn.error")
+_queue_handler: Optional["DroppingQueueHandler"] = None
+
+class RequestContextFilter(logging.Filter):
+    """Attach request id and route to records in the calling thread"""
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        record.request_id = request_id.get()
+        scope = request_scope.get()
+        if scope is None:
+            record.route = None
+        else:
+            route = scope.get("route")
+            record.route = getattr(route, "path", None) or scope.get("path")
+        return True
+
+class RepeatSamplingFilter(logging.Filter):
+    """
+    Per-route sampling of repetitive records.
+    Records are keyed by (route, logger, message template); each key may emit
+    `burst` records per `window` seconds. The next record let through after a
+    quiet period carries the number suppressed in between.
+    """
+
+    def __init__(self, burst: int, window: float, max_keys: int = 10000):
+        super().__init__()
+        self.burst = burst
+        self.window = window
+        self.max_keys = max_keys
+        self._counters: Dict[Tuple, list] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        # Anything at ERROR or below is sampled; CRITICAL always goes through
+        if record.levelno >= logging.CRITICAL:
+            return True
+
+        key = (getattr(record, "route", None), record.name, record.msg)
+        now = time.monotonic()
+
+        with self._lock:
+            counter = self._counters.get(key)
+            if counter is None or now - counter[0] >= self.window:
+                suppressed = counter[2] if counter else 0
+                if counter is None and len(self._counters) >= self.max_keys:
+                    self._counters.clear()
+                self._counters[key] = [now, 1, 0]
+                if suppressed:
+                    record.suppressed = suppressed
+                return True
+
+            if counter[1] < self.burst:
+                counter[1] += 1
+                return True
+
+            counter[2] += 1
+            return False
+
+class JsonFormatter(logging.Formatter):
+    """One JSON object per line"""
+
+    def format(self, record: logging.LogRecord) -> str:
+        entry = {
+            "timestamp": datetime.fromtimestamp(record.created, tz=timezone.utc).isoformat(),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+            "request_id": getattr(record, "request_id", None),
+            "route": getattr(record, "route", None),
+        }
+
+        suppressed = getattr(record, "suppressed", None)
+        if suppressed:
+            entry["suppressed"] = suppressed
+
+        if record.exc_info:
+            entry["exception"] = self.formatException(record.exc_info)
+
+        return json.dumps(entry, default=str)
+
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """
+    QueueHandler that never blocks the caller: when the queue is full the
+    record is dropped and counted instead of waiting for the writer thread.
+    """
+
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        # Resolve args now (they may change after the call returns) but leave
+        # formatting and exc_info to the writer thread
+        record = copy.copy(record)
+        record.msg = record.getMessage()
+        record.args = None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+class DropReportingListener(logging.handlers.QueueListener):
+    """
+    QueueListener that reports records dropped by the queue handler.
+    The report is written from the writer thread straight to the output
+    handlers, at most once per interval and once more on stop, so it never
+    competes for space in the full queue it is reporting on.
+    """
+
+    def __init__(self, log_queue: queue.Queue, source: DroppingQueueHandler, *handlers, interval: float, respect_handler_level: bool = False):
+        super().__init__(log_queue, *handlers, respect_handler_level=respect_handler_level)
+        self.source = source
+        self.interval = interval
+        self._reported = 0
+        self._last_report = time.monotonic()
+
+    def handle(self, record: logging.LogRecord) -> None:
+        super().handle(record)
+        self.report_dropped()
+
+    def stop(self) -> None:
+        super().stop()
+        self.report_dropped(force=True)
+
+    def report_dropped(self, force: bool = False) -> None:
+        now = time.monotonic()
+        if not force and now - self._last_report < self.interval:
+            return
+        self._last_report = now
+
+        dropped = self.source.dropped
+        if dropped <= self._reported:
+            return
+
+        record = logging.LogRecord(
+            __name__, logging.WARNING, __file__, 0,
+            "Log queue full, dropped %d records (%d since start)", (dropped - self._reported, dropped), None
+        )
+        self._reported = dropped
+        super().handle(record)
+
+def dropped_log_records() -> int:
+    """Records dropped because the log queue was full, since setup_logging()"""
+    return _queue_handler.dropped if _queue_handler is not None else 0
+
+def setup_logging() -> None:
+    """Route all logging through a bounded queue to a background JSON writer"""
+    global _listener, _queue_handler
+
+    if _listener is not None:
+        return
+
+    log_queue: queue.Queue = queue.Queue(maxsize=settings.LOG_QUEUE_SIZE)
+
+    queue_handler = DroppingQueueHandler(log_queue)
+    # Filters run in the caller so they see its request context
+    queue_handler.addFilter(RequestContextFilter())
+    queue_handler.addFilter(RepeatSamplingFilter(settings.LOG_SAMPLE_BURST, settings.LOG_SAMPLE_WINDOW_SECONDS))
+
+    stream_handler = logging.StreamHandler(sys.stdout)
+    stream_handler.setFormatter(JsonFormatter())
+
+    root = logging.getLogger()
+    root.handlers = [queue_handler]
+    root.setLevel(settings.LOG_LEVEL)
+
+    # Uvicorn configures its own stdout handlers before importing the app;
+    # route its access and error logs through the queue as well
+    for name in UVICORN_LOGGERS:
+        uvicorn_logger = logging.getLogger(name)
+        uvicorn_logger.handlers = []
+        uvicorn_logger.propagate = True
+
+    # httpx logs every Supabase request at INFO
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    _queue_handler = queue_handler
+    _listener = DropReportingListener(
+        log_queue, queue_handler, stream_handler,
+        interval=settings.LOG_DROP_REPORT_SECONDS,
+        respect_handler_level=True
+    )
+    _listener.start()
+
+def shutdown_logging() -> None:
+    """Flush queued records and stop the writer thread"""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+class RequestContextMiddleware:
+    """
+    ASGI middleware that assigns each request an id (or reuses X-Request-ID),
+    exposes it to log records and echoes it in the response headers.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        incoming = dict(scope["headers"]).get(b"x-request-id")
+        rid = incoming.decode("latin-1")[:64] if incoming else uuid.uuid4().hex
+
+        async def send_with_request_id(message):
+            if message["type"] == "http.response.start":
+                message["headers"] = list(message.get("headers", [])) + [(b"x-request-id", rid.encode("latin-1"))]
+            await send(message)
+
+        id_token = request_id.set(rid)
+        scope_token = request_scope.set(scope)
+        try:
+            await self.app(scope, receive, send_with_request_id)
+        finally:
+            request_id.reset(id_token)
+            request_scope.reset(scope_token)
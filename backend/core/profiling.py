@@ -0,0 +1,183 @@
+import asyncio
+import random
+import sys
+import time
+import threading
+from collections import Counter, deque
+from typing import Deque, Dict, List, Optional
+from core.config import settings
+from core.security import tokens_match
+
+class ProfileSession:
+    """Stack samples collected while a single request was in flight"""
+
+    def __init__(self, thread_id: int, task: Optional[asyncio.Task] = None):
+        self.thread_id = thread_id
+        # The request's task, when started on an event loop
+        self.task = task
+        self.loop = task.get_loop() if task is not None else None
+        self.started_at = time.time()
+        self.duration_ms = 0.0
+        self.stacks: Counter = Counter()
+
+    def to_dict(self) -> dict:
+        return {
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 2),
+            "samples": sum(self.stacks.values())
+        }
+
+class SamplingProfiler:
+    """
+    Low-overhead wall-clock sampling profiler.
+    A daemon thread snapshots the stack of each profiled request's thread every
+    interval and aggregates them as collapsed stacks (flamegraph.pl / speedscope
+    format). The thread only wakes while at least one session is active.
+
+    Requests share the event loop thread, so a session started inside a task
+    only keeps samples taken while that task is the one running on the loop.
+    Samples of other requests, background workers and the idle loop are
+    dropped; time the request spends awaiting therefore does not appear.
+    """
+
+    def __init__(self, interval_ms: float, buffer_size: int, max_routes: int = 100):
+        self.interval = interval_ms / 1000.0
+        self.buffer_size = buffer_size
+        self.max_routes = max_routes
+        self.profiles: Dict[str, Deque[ProfileSession]] = {}
+        self._active: List[ProfileSession] = []
+        self._lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self) -> ProfileSession:
+        """Begin sampling the calling thread, or the calling task on an event loop"""
+        try:
+            task = asyncio.current_task()
+        except RuntimeError:
+            task = None
+        session = ProfileSession(threading.get_ident(), task)
+        with self._lock:
+            self._active.append(session)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+                self._thread.start()
+        self._wakeup.set()
+        return session
+
+    def stop(self, session: ProfileSession, route: str) -> None:
+        """Stop sampling and store the session in the route's ring buffer"""
+        session.duration_ms = (time.time() - session.started_at) * 1000
+        with self._lock:
+            self._active.remove(session)
+            if not self._active:
+                self._wakeup.clear()
+            buffer = self.profiles.get(route)
+            if buffer is None:
+                if len(self.profiles) >= self.max_routes:
+                    return
+                buffer = self.profiles[route] = deque(maxlen=self.buffer_size)
+            buffer.append(session)
+
+    def _run(self) -> None:
+        while True:
+            self._wakeup.wait()
+            time.sleep(self.interval)
+            with self._lock:
+                sessions = list(self._active)
+            if not sessions:
+                continue
+
+            running = self._running_tasks(sessions)
+            frames = sys._current_frames()
+            # Read again: a task switch while frames were taken would mix two requests
+            if running != self._running_tasks(sessions):
+                continue
+
+            thread_stacks: Dict[int, str] = {}
+            samples: Dict[ProfileSession, str] = {}
+            for session in sessions:
+                if session.task is not None and running.get(session.loop) is not session.task:
+                    continue
+                if session.thread_id not in thread_stacks and session.thread_id in frames:
+                    thread_stacks[session.thread_id] = self._collapse(frames[session.thread_id])
+                if session.thread_id in thread_stacks:
+                    samples[session] = thread_stacks[session.thread_id]
+
+            with self._lock:
+                # Only sessions still active; stopped ones may already be read by collapsed()
+                for session in self._active:
+                    stack = samples.get(session)
+                    if stack:
+                        session.stacks[stack] += 1
+
+    @staticmethod
+    def _running_tasks(sessions: List[ProfileSession]) -> dict:
+        """Task currently running on each session's loop (None while the loop is idle)"""
+        return {session.loop: asyncio.current_task(session.loop) for session in sessions if session.loop is not None}
+
+    @staticmethod
+    def _collapse(frame) -> str:
+        """Render a frame chain root-first as 'func (file:line);...'"""
+        names = []
+        while frame is not None:
+            code = frame.f_code
+            names.append(f"{code.co_name} ({code.co_filename}:{frame.f_lineno})")
+            frame = frame.f_back
+        names.reverse()
+        return ";".join(names)
+
+    def summary(self) -> Dict[str, List[dict]]:
+        """Per-route list of buffered profiles, oldest first"""
+        with self._lock:
+            return {route: [s.to_dict() for s in buffer] for route, buffer in self.profiles.items()}
+
+    def collapsed(self, route: str) -> Optional[str]:
+        """Merge a route's buffered profiles into collapsed-stack text"""
+        with self._lock:
+            buffer = self.profiles.get(route)
+            if buffer is None:
+                return None
+            merged: Counter = Counter()
+            for session in buffer:
+                merged.update(session.stacks)
+        return "\n".join(f"{stack} {count}" for stack, count in merged.most_common())
+
+class ProfilingMiddleware:
+    """
+    ASGI middleware profiling a sample of requests, plus every request that
+    carries X-Profile-Token. Pure ASGI so the endpoint runs in the request's
+    own task, which is what samples are attributed to.
+    """
+
+    def __init__(self, app, profiler: SamplingProfiler, sample_rate: float, token: str):
+        self.app = app
+        self.profiler = profiler
+        self.sample_rate = sample_rate
+        self.token = token
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        raw = dict(scope["headers"]).get(b"x-profile-token")
+        privileged = raw is not None and tokens_match(raw.decode("latin-1"), self.token)
+
+        if not privileged and random.random() >= self.sample_rate:
+            await self.app(scope, receive, send)
+            return
+
+        session = self.profiler.start()
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            # Use the route template so path parameters share one buffer
+            route = scope.get("route")
+            self.profiler.stop(session, getattr(route, "path", None) or "<unmatched>")
+
+def profiling_enabled() -> bool:
+    """Profiling is off unless sampling or the privileged header is configured"""
+    return settings.PROFILER_SAMPLE_RATE > 0 or bool(settings.PROFILER_TOKEN)
+
+profiler = SamplingProfiler(settings.PROFILER_INTERVAL_MS, settings.PROFILER_BUFFER_SIZE)
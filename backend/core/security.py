@@ -56,6 +56,8 @@
     
 #     return {"user_id": user_id, "username": payload.get("username")}
 
+import hmac
+import logging
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
@@ -71,6 +73,7 @@ pwd_context = CryptContext(
     bcrypt__rounds=12  # Explicitly set rounds
 )
 security = HTTPBearer()
+logger = logging.getLogger(__name__)
 
 def hash_password(password: str) -> str:
     """
@@ -88,7 +91,7 @@ def hash_password(password: str) -> str:
         
         return pwd_context.hash(password)
     except Exception as e:
-        print(f"Error hashing password: {e}")
+        logger.exception("Error hashing password: %s", e)
         raise HTTPException(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail="Error processing password"
@@ -108,9 +111,18 @@ def verify_password(plain_password: str, hashed_password: str) -> bool:
         
         return pwd_context.verify(plain_password, hashed_password)
     except Exception as e:
-        print(f"Error verifying password: {e}")
+        logger.warning("Error verifying password: %s", e)
         return False
 
+def tokens_match(token: Optional[str], expected: str) -> bool:
+    """
+    Constant-time comparison of a client-supplied token or signature.
+    Compared as UTF-8 bytes: compare_digest raises TypeError on non-ASCII str.
+    """
+    if not token or not expected:
+        return False
+    return hmac.compare_digest(token.encode(), expected.encode())
+
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None) -> str:
     """Create a JWT access token"""
     to_encode = data.copy()
@@ -140,7 +152,7 @@ def decode_token(token: str) -> dict:
         )
         return payload
     except JWTError as e:
-        print(f"JWT decode error: {e}")
+        logger.info("JWT decode error: %s", e)
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Could not validate credentials",
@@ -42,8 +42,16 @@
 import os
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
-from routers import auth, users, bets, payment
+from routers import auth, users, bets, payment, admin
 from core.config import settings
+from core.logging_config import RequestContextMiddleware, dropped_log_records, setup_logging, shutdown_logging
+from core.profiling import ProfilingMiddleware, profiler, profiling_enabled
+from core.load_shedding import LoadSheddingMiddleware, limiter
+from supabase_client.read_router import ReadYourWritesMiddleware
+from services.payment_service import payment_service
+from services.bet_service import bet_service
+
+setup_logging()
 
 # Determine API prefix based on environment
 # In production (behind ALB), ALB forwards /api/* to this service
@@ -58,6 +66,14 @@ app = FastAPI(
     root_path=API_PREFIX if ENVIRONMENT == "production" else ""
 )
 
+# Load shedding - added before CORS so CORS wraps it and 503s carry CORS headers
+if settings.LOAD_SHEDDING_ENABLED:
+    app.add_middleware(
+        LoadSheddingMiddleware,
+        limiter=limiter,
+        retry_after=settings.LOAD_SHED_RETRY_AFTER_SECONDS
+    )
+
 # CORS Configuration - MUST BE BEFORE ROUTES
 app.add_middleware(
     CORSMiddleware,
@@ -75,11 +91,39 @@ app.add_middleware(
     max_age=3600,  # Cache preflight requests for 1 hour
 )
 
+# Request profiling - only registered when configured, so disabled costs nothing
+if profiling_enabled():
+    app.add_middleware(
+        ProfilingMiddleware,
+        profiler=profiler,
+        sample_rate=settings.PROFILER_SAMPLE_RATE,
+        token=settings.PROFILER_TOKEN
+    )
+
 # Include Routers - AFTER CORS MIDDLEWARE
 app.include_router(auth.router, prefix=f"{API_PREFIX}/auth", tags=["Authentication"])
 app.include_router(users.router, prefix=f"{API_PREFIX}/user", tags=["Users"])
 app.include_router(bets.router, prefix=f"{API_PREFIX}/bets", tags=["Betting"])
 app.include_router(payment.router, prefix=f"{API_PREFIX}/payment", tags=["Payment"])
+app.include_router(admin.router, prefix=f"{API_PREFIX}/admin", tags=["Admin"], include_in_schema=False)
+
+# Carries the user's last-write time across pods for replica read-your-writes
+app.add_middleware(ReadYourWritesMiddleware)
+
+# Request ids for structured logs - added last so it wraps every other middleware
+app.add_middleware(RequestContextMiddleware)
+
+@app.on_event("startup")
+async def start_background_workers():
+    # Started here rather than lazily so workers don't inherit a request's log context
+    bet_service.settlement.start()
+    await payment_service.start()
+
+@app.on_event("shutdown")
+async def stop_background_workers():
+    await payment_service.stop()
+    await bet_service.settlement.stop()
+    shutdown_logging()
 
 @app.get("/")
 async def root():
@@ -94,11 +138,11 @@ async def root():
 # Health check endpoint - available at both /health and /api/health
 @app.get("/health")
 async def health_check_dev():
-    return {"status": "healthy", "environment": ENVIRONMENT}
+    return {"status": "healthy", "environment": ENVIRONMENT, "dropped_log_records": dropped_log_records()}
 
 @app.get(f"{API_PREFIX}/health")
 async def health_check_prod():
-    return {"status": "healthy", "environment": ENVIRONMENT}
+    return {"status": "healthy", "environment": ENVIRONMENT, "dropped_log_records": dropped_log_records()}
 
 # Additional OPTIONS handlers for debugging
 @app.options("/auth/register")
@@ -1,7 +1,10 @@
+import logging
 import httpx
 from typing import Optional, Dict, Any
 from core.config import settings
 
+logger = logging.getLogger(__name__)
+
 class MCPClient:
     """
     MCP (Model Context Protocol) Client for handling database operations
@@ -25,7 +28,7 @@ class MCPClient:
             response.raise_for_status()
             return response.json()
         except Exception as e:
-            print(f"MCP authentication error: {e}")
+            logger.warning("MCP authentication error: %s", e)
             return None
     
     async def get_user_balance(self, user_id: str) -> Optional[float]:
@@ -38,7 +41,7 @@ class MCPClient:
             data = response.json()
             return data.get("balance")
         except Exception as e:
-            print(f"MCP balance fetch error: {e}")
+            logger.warning("MCP balance fetch error: %s", e)
             return None
     
     async def update_balance(self, user_id: str, new_balance: float) -> bool:
@@ -51,7 +54,7 @@ class MCPClient:
             response.raise_for_status()
             return True
         except Exception as e:
-            print(f"MCP balance update error: {e}")
+            logger.warning("MCP balance update error: %s", e)
             return False
     
     async def create_bet_record(self, bet_data: Dict[str, Any]) -> Optional[str]:
@@ -65,7 +68,7 @@ class MCPClient:
             data = response.json()
             return data.get("bet_id")
         except Exception as e:
-            print(f"MCP bet creation error: {e}")
+            logger.warning("MCP bet creation error: %s", e)
             return None
 
 # Global MCP client instance
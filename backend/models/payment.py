@@ -0,0 +1,25 @@
+from pydantic import BaseModel, Field
+from typing import Optional
+from datetime import datetime
+
+class PaymentCreate(BaseModel):
+    amount: float = Field(gt=0, allow_inf_nan=False)
+
+class PaymentWebhook(BaseModel):
+    job_id: str
+    reference: str
+    status: str  # 'succeeded' or 'failed'
+    error: Optional[str] = None
+
+class PaymentJobResponse(BaseModel):
+    id: str
+    user_id: str
+    type: str  # 'deposit' or 'withdrawal'
+    amount: float
+    # 'pending', 'queued', 'processing', 'awaiting_confirmation', 'unknown', 'settling',
+    # 'refunding', 'completed', 'failed' or 'needs_reconciliation'
+    status: str
+    reference: Optional[str] = None
+    error: Optional[str] = None
+    created_at: datetime
+    updated_at: datetime
@@ -0,0 +1,53 @@
+from typing import Optional
+from fastapi import APIRouter, Header, HTTPException, status
+from fastapi.responses import PlainTextResponse
+from core.config import settings
+from core.profiling import profiler
+from core.security import tokens_match
+from services.anomaly_detector import anomaly_detector
+
+router = APIRouter()
+
+def require_admin_token(token: Optional[str], expected: str) -> None:
+    """Admin endpoints are hidden unless their token is configured and matches"""
+    if not tokens_match(token, expected):
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+
+@router.get("/profiles")
+async def list_profiles(x_profile_token: Optional[str] = Header(None)):
+    """List buffered request profiles per route"""
+    require_admin_token(x_profile_token, settings.PROFILER_TOKEN)
+    
+    return {
+        "sample_rate": settings.PROFILER_SAMPLE_RATE,
+        "interval_ms": settings.PROFILER_INTERVAL_MS,
+        "routes": profiler.summary()
+    }
+
+@router.get("/profiles/collapsed", response_class=PlainTextResponse)
+async def collapsed_profile(route: str, x_profile_token: Optional[str] = Header(None)):
+    """Collapsed stacks for a route, ready for flamegraph.pl or speedscope"""
+    require_admin_token(x_profile_token, settings.PROFILER_TOKEN)
+    
+    stacks = profiler.collapsed(route)
+    
+    if stacks is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="No profiles recorded for this route"
+        )
+    
+    return stacks
+
+@router.get("/anomalies")
+async def list_anomalies(x_admin_token: Optional[str] = Header(None)):
+    """Recent betting anomaly flags, oldest first"""
+    require_admin_token(x_admin_token, settings.ADMIN_TOKEN)
+    
+    return {
+        "tracked_users": len(anomaly_detector.users),
+        "flags": anomaly_detector.recent_flags()
+    }
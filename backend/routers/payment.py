@@ -1,35 +1,145 @@
-from fastapi import APIRouter, Depends
-from core.security import get_current_user
+import hmac
+import hashlib
+from typing import Callable, Optional
+from fastapi import APIRouter, Depends, Header, HTTPException, Request, status
+from fastapi.encoders import jsonable_encoder
+from fastapi.exceptions import RequestValidationError
+from fastapi.responses import JSONResponse, Response
+from fastapi.routing import APIRoute
+from pydantic import ValidationError
+from core.config import settings
+from core.security import get_current_user, tokens_match
+from models.payment import PaymentCreate, PaymentWebhook, PaymentJobResponse
+from services.payment_service import payment_service
 
-router = APIRouter()
+class PaymentRoute(APIRoute):
+    """
+    Drops "input" from 422 errors: the default handler echoes it back and
+    fails with a 500 when the rejected amount is NaN or Infinity.
+    """
+
+    def get_route_handler(self) -> Callable:
+        handler = super().get_route_handler()
+
+        async def route_handler(request: Request) -> Response:
+            try:
+                return await handler(request)
+            except RequestValidationError as exc:
+                errors = [{key: value for key, value in error.items() if key != "input"} for error in exc.errors()]
+                return JSONResponse(
+                    status_code=status.HTTP_422_UNPROCESSABLE_ENTITY,
+                    content={"detail": jsonable_encoder(errors)}
+                )
+
+        return route_handler
+
+router = APIRouter(route_class=PaymentRoute)
+
+def validate_amount(payment_data: PaymentCreate):
+    # Positive and finite are enforced by PaymentCreate; the ceiling is configurable
+    if payment_data.amount > settings.PAYMENT_MAX_AMOUNT:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"Amount must not exceed {settings.PAYMENT_MAX_AMOUNT:g}"
+        )
+
+def ensure_capacity():
+    """Refuse new jobs when the queue is full instead of piling up work"""
+    if payment_service.is_busy():
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail="Payment service is busy, please retry shortly",
+            headers={"Retry-After": "5"}
+        )
+
+def accepted(job: dict) -> dict:
+    return {
+        "message": f"{job['type'].capitalize()} accepted for processing",
+        "job_id": job["id"],
+        "status": job["status"]
+    }
 
 @router.get("/status")
 async def payment_status(current_user: dict = Depends(get_current_user)):
     """Get payment gateway status"""
-    # TODO: Integrate real payment gateway here in future
-    # Possible integrations: Stripe, PayPal, Razorpay, etc.
-    
     return {
-        "status": "coming_soon",
-        "message": "Payment Gateway Integration Coming Soon",
-        "supported_methods": [],
-        "note": "This endpoint will support deposits and withdrawals in future releases"
+        "status": "busy" if payment_service.is_busy() else "operational",
+        "gateway": settings.PAYMENT_GATEWAY,
+        "supported_methods": ["deposit", "withdraw"],
+        "queued_jobs": payment_service.queue.qsize() if payment_service.queue else 0
     }
 
-@router.post("/deposit")
-async def deposit(current_user: dict = Depends(get_current_user)):
-    """Deposit funds (placeholder)"""
-    # TODO: Implement payment gateway deposit logic
-    return {
-        "status": "not_implemented",
-        "message": "Deposit functionality will be available soon"
-    }
+@router.get("/status/{job_id}", response_model=PaymentJobResponse)
+async def payment_job_status(job_id: str, current_user: dict = Depends(get_current_user)):
+    """Get progress of a deposit or withdrawal job"""
+    job = await payment_service.get_job(job_id, current_user["user_id"])
+    
+    if job is None:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Payment job not found"
+        )
+    
+    return job
 
-@router.post("/withdraw")
-async def withdraw(current_user: dict = Depends(get_current_user)):
-    """Withdraw funds (placeholder)"""
-    # TODO: Implement payment gateway withdrawal logic
-    return {
-        "status": "not_implemented",
-        "message": "Withdrawal functionality will be available soon"
-    }
\ No newline at end of file
+@router.post("/deposit", status_code=status.HTTP_202_ACCEPTED)
+async def deposit(payment_data: PaymentCreate, current_user: dict = Depends(get_current_user)):
+    """Queue a deposit; poll /payment/status/{job_id} for the outcome"""
+    validate_amount(payment_data)
+    ensure_capacity()
+    
+    job, error = await payment_service.create_deposit(current_user["user_id"], payment_data.amount)
+    
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+    
+    return accepted(job)
+
+@router.post("/withdraw", status_code=status.HTTP_202_ACCEPTED)
+async def withdraw(payment_data: PaymentCreate, current_user: dict = Depends(get_current_user)):
+    """Reserve funds and queue a withdrawal; poll /payment/status/{job_id} for the outcome"""
+    validate_amount(payment_data)
+    ensure_capacity()
+    
+    job, error = await payment_service.create_withdrawal(current_user["user_id"], payment_data.amount)
+    
+    if error:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=error
+        )
+    
+    return accepted(job)
+
+@router.post("/webhook")
+async def payment_webhook(request: Request, x_webhook_signature: Optional[str] = Header(None)):
+    """Gateway callback, signed with HMAC-SHA256 of the raw body"""
+    if not settings.PAYMENT_WEBHOOK_SECRET:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Not Found"
+        )
+    
+    body = await request.body()
+    expected = hmac.new(settings.PAYMENT_WEBHOOK_SECRET.encode(), body, hashlib.sha256).hexdigest()
+    
+    if not tokens_match(x_webhook_signature, expected):
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Invalid webhook signature"
+        )
+    
+    try:
+        event = PaymentWebhook.model_validate_json(body)
+    except ValidationError as e:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=str(e)
+        )
+    
+    await payment_service.handle_webhook(event)
+    
+    return {"status": "received"}
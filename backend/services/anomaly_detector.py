@@ -0,0 +1,191 @@
+import hashlib
+import logging
+import math
+import time
+from collections import OrderedDict, deque
+from typing import Deque, Iterable, List, Optional, Tuple
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+class CountMinSketch:
+    """Fixed-memory frequency estimates; never under-counts"""
+
+    def __init__(self, width: int = 2048, depth: int = 4):
+        self.width = width
+        self.depth = depth
+        self.rows = [[0] * width for _ in range(depth)]
+
+    def _indexes(self, key: str) -> List[int]:
+        # blake2b rather than hash(): stable across processes, so replays collide the same way.
+        # One digest, split into an independent 32-bit hash per row.
+        digest = hashlib.blake2b(key.encode(), digest_size=4 * self.depth).digest()
+        return [int.from_bytes(digest[4 * i:4 * i + 4], "little") % self.width for i in range(self.depth)]
+
+    def add(self, key: str) -> int:
+        """Count key once and return its new estimate"""
+        estimate = None
+        for row, index in zip(self.rows, self._indexes(key)):
+            row[index] += 1
+            if estimate is None or row[index] < estimate:
+                estimate = row[index]
+        return estimate
+
+    def estimate(self, key: str) -> int:
+        return min(row[index] for row, index in zip(self.rows, self._indexes(key)))
+
+class UserBetState:
+    """Constant-size per-user counters"""
+
+    __slots__ = (
+        "rate", "last_seen", "last_amount", "last_horse", "last_result",
+        "doubling_streak", "same_horse_streak", "last_flagged"
+    )
+
+    def __init__(self):
+        self.rate = 0.0  # EWMA bets per second
+        self.last_seen: Optional[float] = None
+        self.last_amount = 0.0
+        self.last_horse: Optional[int] = None
+        self.last_result: Optional[str] = None
+        self.doubling_streak = 0
+        self.same_horse_streak = 0
+        self.last_flagged: dict = {}  # kind -> time, to avoid repeating a flag on every bet
+
+class AnomalyDetector:
+    """
+    Streaming detector for bot-like betting, fed from bet settlement once the
+    bets have been resolved. observe() is O(1) and does no I/O: flags go to a
+    bounded in-memory buffer and the (queued, non-blocking) logger.
+    Timestamps are epoch seconds of the bet, so replaying recorded events
+    yields the same flags, flagged_at included.
+
+    Flags:
+    - burst: EWMA bet rate above burst_rate per second
+    - martingale: stake roughly doubled after each of the last N losses
+    - same_horse_high_stake: N high-stake bets in a row on one horse
+    - hot_user: Count-Min estimate of bets in the current + previous window
+      above hot_user_threshold
+    """
+
+    def __init__(
+        self,
+        burst_rate: float = settings.ANOMALY_BURST_RATE_PER_SECOND,
+        rate_window_seconds: float = settings.ANOMALY_RATE_WINDOW_SECONDS,
+        high_stake: float = settings.ANOMALY_HIGH_STAKE,
+        hot_user_threshold: int = settings.ANOMALY_HOT_USER_BETS,
+        window_seconds: float = settings.ANOMALY_WINDOW_SECONDS,
+        martingale_streak: int = 3,
+        same_horse_streak: int = 5,
+        flag_cooldown_seconds: float = 300.0,
+        max_users: int = 100000,
+        max_flags: int = 1000,
+        sketch_width: int = 2048
+    ):
+        self.burst_rate = burst_rate
+        self.tau = rate_window_seconds
+        self.high_stake = high_stake
+        self.hot_user_threshold = hot_user_threshold
+        self.window_seconds = window_seconds
+        self.martingale_streak = martingale_streak
+        self.same_horse_streak = same_horse_streak
+        self.flag_cooldown = flag_cooldown_seconds
+        self.max_users = max_users
+        self.users: "OrderedDict[str, UserBetState]" = OrderedDict()
+        self.flags: Deque[dict] = deque(maxlen=max_flags)
+        self.sketch_width = sketch_width
+        self._current = CountMinSketch(sketch_width)
+        self._previous = CountMinSketch(sketch_width)
+        self._window_start: Optional[float] = None
+
+    def observe(
+        self,
+        user_id: str,
+        horse_choice: int,
+        bet_amount: float,
+        result: str,
+        now: Optional[float] = None
+    ) -> List[dict]:
+        """Update counters with one settled bet and return any new flags"""
+        if now is None:
+            now = time.time()
+
+        state = self.users.get(user_id)
+        if state is None:
+            state = self.users[user_id] = UserBetState()
+            if len(self.users) > self.max_users:
+                self.users.popitem(last=False)
+        else:
+            self.users.move_to_end(user_id)
+
+        raised = []
+
+        # Continuous-time EWMA of the bet rate
+        if state.last_seen is None:
+            state.rate = 1.0 / self.tau
+        else:
+            state.rate = state.rate * math.exp(-(now - state.last_seen) / self.tau) + 1.0 / self.tau
+        state.last_seen = now
+
+        if state.rate > self.burst_rate:
+            self._flag(raised, state, user_id, "burst", now, rate=round(state.rate, 3))
+
+        # Martingale: stake ~2x the previous one, right after a loss
+        if state.last_result == "loss" and state.last_amount > 0 and bet_amount >= 1.9 * state.last_amount:
+            state.doubling_streak += 1
+        else:
+            state.doubling_streak = 0
+
+        if state.doubling_streak >= self.martingale_streak:
+            self._flag(raised, state, user_id, "martingale", now, streak=state.doubling_streak, amount=bet_amount)
+
+        # Same horse at high stakes
+        if bet_amount >= self.high_stake:
+            if horse_choice == state.last_horse and state.same_horse_streak > 0:
+                state.same_horse_streak += 1
+            else:
+                state.same_horse_streak = 1
+        else:
+            state.same_horse_streak = 0
+
+        if state.same_horse_streak >= self.same_horse_streak:
+            self._flag(raised, state, user_id, "same_horse_high_stake", now, streak=state.same_horse_streak, horse=horse_choice)
+
+        # Heavy hitters across all users, in two rotating windows
+        if self._window_start is None or now - self._window_start >= self.window_seconds:
+            self._previous = self._current
+            self._current = CountMinSketch(self.sketch_width)
+            self._window_start = now
+
+        count = self._current.add(user_id) + self._previous.estimate(user_id)
+        if count > self.hot_user_threshold:
+            self._flag(raised, state, user_id, "hot_user", now, bets=count)
+
+        state.last_amount = bet_amount
+        state.last_horse = horse_choice
+        state.last_result = result
+
+        return raised
+
+    def replay(self, events: Iterable[Tuple[str, int, float, str, float]]) -> List[dict]:
+        """Feed (user_id, horse_choice, bet_amount, result, timestamp) events and collect flags"""
+        raised = []
+        for user_id, horse_choice, bet_amount, result, timestamp in events:
+            raised.extend(self.observe(user_id, horse_choice, bet_amount, result, now=timestamp))
+        return raised
+
+    def recent_flags(self) -> List[dict]:
+        return list(self.flags)
+
+    def _flag(self, raised: List[dict], state: UserBetState, user_id: str, kind: str, now: float, **detail):
+        last = state.last_flagged.get(kind)
+        if last is not None and now - last < self.flag_cooldown:
+            return
+        state.last_flagged[kind] = now
+
+        flag = {"user_id": user_id, "kind": kind, "detail": detail, "flagged_at": now}
+        self.flags.append(flag)
+        raised.append(flag)
+        logger.warning("Betting anomaly %s for user %s: %s", kind, user_id, detail)
+
+anomaly_detector = AnomalyDetector()
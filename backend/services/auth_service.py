@@ -1,17 +1,22 @@
+import logging
 from typing import Optional, Tuple
 from models.user import UserCreate, UserLogin
 from core.security import hash_password, verify_password, create_access_token
-from supabase_client.supabase_client import get_supabase_admin_client
+from supabase_client.supabase_client import get_supabase_admin_client, get_supabase_replica_clients
+from supabase_client.read_router import ReadRouter
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 class AuthService:
     def __init__(self):
         self.supabase = get_supabase_admin_client()
+        self.db = ReadRouter(self.supabase, get_supabase_replica_clients(admin=True))
     
     async def register_user(self, user_data: UserCreate) -> Tuple[Optional[dict], Optional[str]]:
         """Register a new user"""
         try:
-            # Check if user already exists
+            # Check if user already exists (on primary: a lagging replica could miss it)
             existing = self.supabase.table('users').select('*').eq('username', user_data.username).execute()
             
             if existing.data:
@@ -34,7 +39,7 @@ class AuthService:
                 "created_at": datetime.utcnow().isoformat()
             }
             
-            result = self.supabase.table('users').insert(user_insert).execute()
+            result = self.db.write(lambda client: client.table('users').insert(user_insert))
             
             if not result.data:
                 return None, "Failed to create user"
@@ -47,19 +52,25 @@ class AuthService:
                 "balance": 1000.0  # Initial balance
             }
             
-            self.supabase.table('wallets').insert(wallet_insert).execute()
+            # Marks the new user so an immediate login and balance read see these rows
+            self.db.write(lambda client: client.table('wallets').insert(wallet_insert), user_id=user['id'])
             
             return user, None
             
         except Exception as e:
-            print(f"Registration error: {e}")
+            logger.exception("Registration error: %s", e)
             return None, str(e)
     
     async def authenticate_user(self, login_data: UserLogin) -> Tuple[Optional[dict], Optional[str], Optional[str]]:
         """Authenticate user and return user data with token"""
         try:
-            # Fetch user from database
-            result = self.supabase.table('users').select('*').eq('username', login_data.username).execute()
+            # Fetch user from database (replica is fine: credentials rarely change)
+            query = lambda client: client.table('users').select('*').eq('username', login_data.username)
+            result = self.db.read(query)
+            
+            if not result.data:
+                # The user may have just registered and not reached the replica yet
+                result = self.db.read_primary(query)
             
             if not result.data:
                 return None, None, "Invalid username or password"
@@ -87,7 +98,7 @@ class AuthService:
             return user_response, access_token, None
             
         except Exception as e:
-            print(f"Authentication error: {e}")
+            logger.exception("Authentication error: %s", e)
             return None, None, str(e)
 
 auth_service = AuthService()
\ No newline at end of file
@@ -1,50 +1,81 @@
+import asyncio
+import logging
 import random
-from typing import Optional, Dict
-from datetime import datetime
+from typing import Optional, Dict, List
+from datetime import datetime, timezone
 from models.bet import BetCreate
+from core.config import settings
 from services.user_service import user_service
-from supabase_client.supabase_client import get_supabase_client
+from services.settlement_queue import SettlementQueue
+from services.anomaly_detector import anomaly_detector
+from supabase_client.supabase_client import get_supabase_client, get_supabase_replica_clients
+from supabase_client.read_router import ReadRouter, recent_writes
+
+logger = logging.getLogger(__name__)
 
 class BetService:
     def __init__(self):
         self.supabase = get_supabase_client()
+        self.db = ReadRouter(self.supabase, get_supabase_replica_clients())
         self.win_multiplier = 2.0  # 2x payout for winning bets
-    
+        # Concurrent bets from one user are settled together against one balance read
+        self.settlement = SettlementQueue(
+            self.settle_horse_bets,
+            shards=settings.BET_SETTLEMENT_SHARDS,
+            window_ms=settings.BET_SETTLEMENT_WINDOW_MS,
+            max_batch=settings.BET_SETTLEMENT_MAX_BATCH
+        )
+
     async def place_horse_bet(self, user_id: str, bet_data: BetCreate) -> Optional[Dict]:
         """Process a horse race bet"""
         try:
-            # Get current balance
-            current_balance = await user_service.get_user_balance(user_id)
-            
-            if current_balance is None:
-                return None
-            
-            if current_balance < bet_data.bet_amount:
-                return {"error": "Insufficient balance"}
-            
+            result = await self.settlement.submit(user_id, bet_data)
+            # Settlement runs in a worker task; mark again here so the marker reaches this response
+            if result is not None and "error" not in result:
+                recent_writes.mark(user_id)
+            return result
+        except Exception as e:
+            logger.exception("Bet processing error: %s", e)
+            return {"error": str(e)}
+
+    async def settle_horse_bets(self, user_id: str, bets: List[BetCreate]) -> List[Optional[Dict]]:
+        """
+        Settle a user's queued bets in arrival order
+        One balance read, one wallet write and one bulk bets insert per batch
+        """
+        # Get current balance (from primary: this is a read-modify-write)
+        current_balance = await user_service.get_user_balance(user_id, consistent=True)
+
+        if current_balance is None:
+            return [None] * len(bets)
+
+        results: List[Optional[Dict]] = []
+        bet_records = []
+        balances = []  # Running balance after each settled bet
+        settled = []  # Indices into results of bets that passed the balance check
+        new_balance = current_balance
+
+        for bet_data in bets:
+            if new_balance < bet_data.bet_amount:
+                results.append({"error": "Insufficient balance"})
+                continue
+
             # Randomly determine winning horse (1-4)
             winning_horse = random.randint(1, 4)
-            
+
             # Determine result
             is_winner = bet_data.horse_choice == winning_horse
             result = "win" if is_winner else "loss"
-            
+
             # Calculate new balance and winnings
             if is_winner:
                 winnings = bet_data.bet_amount * self.win_multiplier
-                new_balance = current_balance + winnings
+                new_balance = new_balance + winnings
             else:
                 winnings = 0
-                new_balance = current_balance - bet_data.bet_amount
-            
-            # Update balance
-            balance_updated = await user_service.update_user_balance(user_id, new_balance)
-            
-            if not balance_updated:
-                return {"error": "Failed to update balance"}
-            
-            # Record bet in database
-            bet_record = {
+                new_balance = new_balance - bet_data.bet_amount
+
+            bet_records.append({
                 "user_id": user_id,
                 "horse_choice": bet_data.horse_choice,
                 "bet_amount": bet_data.bet_amount,
@@ -52,29 +83,59 @@ class BetService:
                 "result": result,
                 "winnings": winnings,
                 "created_at": datetime.utcnow().isoformat()
-            }
-            
-            insert_result = self.supabase.table('bets').insert(bet_record).execute()
-            
-            if not insert_result.data:
-                return {"error": "Failed to record bet"}
-            
-            bet_id = insert_result.data[0]['id']
-            
-            return {
-                "id": bet_id,
+            })
+            balances.append(new_balance)
+            settled.append(len(results))
+            results.append(None)
+
+        if not bet_records:
+            return results
+
+        # Update balance
+        balance_updated = await user_service.update_user_balance(user_id, new_balance)
+
+        if not balance_updated:
+            for index in settled:
+                results[index] = {"error": "Failed to update balance"}
+            return results
+
+        # Record bets in database
+        insert_result = self.db.write(
+            lambda client: client.table('bets').insert(bet_records),
+            user_id=user_id
+        )
+
+        if not insert_result.data or len(insert_result.data) != len(bet_records):
+            for index in settled:
+                results[index] = {"error": "Failed to record bet"}
+            return results
+
+        for index, bet_record, row, balance in zip(settled, bet_records, insert_result.data, balances):
+            results[index] = {
+                "id": row['id'],
                 "user_id": user_id,
-                "horse_choice": bet_data.horse_choice,
-                "bet_amount": bet_data.bet_amount,
-                "winning_horse": winning_horse,
-                "result": result,
-                "winnings": winnings,
-                "new_balance": new_balance,
+                "horse_choice": bet_record["horse_choice"],
+                "bet_amount": bet_record["bet_amount"],
+                "winning_horse": bet_record["winning_horse"],
+                "result": bet_record["result"],
+                "winnings": bet_record["winnings"],
+                "new_balance": balance,
                 "created_at": bet_record["created_at"]
             }
-            
-        except Exception as e:
-            print(f"Bet processing error: {e}")
-            return {"error": str(e)}
 
-bet_service = BetService()
\ No newline at end of file
+        if settings.ANOMALY_DETECTION_ENABLED:
+            # Scheduled rather than called: SettlementQueue resolves the waiting
+            # bets as soon as this returns, and the detector runs after that
+            asyncio.get_running_loop().call_soon(self._observe_bets, user_id, bet_records)
+
+        return results
+
+    def _observe_bets(self, user_id: str, bet_records: List[Dict]):
+        for bet_record in bet_records:
+            # created_at is naive UTC
+            placed_at = datetime.fromisoformat(bet_record["created_at"]).replace(tzinfo=timezone.utc).timestamp()
+            anomaly_detector.observe(
+                user_id, bet_record["horse_choice"], bet_record["bet_amount"], bet_record["result"], now=placed_at
+            )
+
+bet_service = BetService()
@@ -0,0 +1,77 @@
+import asyncio
+import random
+import uuid
+from typing import Awaitable, Callable, Dict, Optional, Set, Tuple, Type
+from models.payment import PaymentWebhook
+from core.config import settings
+
+WebhookHandler = Callable[[PaymentWebhook], Awaitable[None]]
+
+class PaymentGateway:
+    """
+    Adapter interface for payment gateways.
+    submit() hands a job to the gateway and returns (reference, error). The final
+    outcome arrives later as a webhook, delivered to webhook_handler either by
+    the /payment/webhook endpoint or, for in-process gateways, directly.
+    """
+
+    def __init__(self):
+        self.webhook_handler: Optional[WebhookHandler] = None
+
+    async def submit(self, job: dict) -> Tuple[Optional[str], Optional[str]]:
+        raise NotImplementedError
+
+class FakePaymentGateway(PaymentGateway):
+    """Local stand-in that simulates gateway latency, declines and async confirmation"""
+
+    def __init__(
+        self,
+        latency_seconds: float = settings.FAKE_GATEWAY_LATENCY_SECONDS,
+        failure_rate: float = settings.FAKE_GATEWAY_FAILURE_RATE
+    ):
+        super().__init__()
+        self.latency_seconds = latency_seconds
+        self.failure_rate = failure_rate
+        self._callbacks: Set[asyncio.Task] = set()
+
+    async def submit(self, job: dict) -> Tuple[Optional[str], Optional[str]]:
+        await asyncio.sleep(random.uniform(0.5, 1.5) * self.latency_seconds)
+
+        if random.random() < self.failure_rate:
+            return None, "Payment declined by gateway"
+
+        reference = f"fake_{uuid.uuid4().hex[:16]}"
+
+        # Keep a reference so the callback task is not garbage collected
+        task = asyncio.create_task(self._send_webhook(job, reference))
+        self._callbacks.add(task)
+        task.add_done_callback(self._callbacks.discard)
+
+        return reference, None
+
+    async def _send_webhook(self, job: dict, reference: str) -> None:
+        await asyncio.sleep(random.uniform(0.1, 0.5) * self.latency_seconds)
+
+        if self.webhook_handler is None:
+            return
+
+        # Settlement can still fail after the gateway accepted the request
+        if random.random() < self.failure_rate / 2:
+            event = PaymentWebhook(job_id=job["id"], reference=reference, status="failed", error="Settlement failed")
+        else:
+            event = PaymentWebhook(job_id=job["id"], reference=reference, status="succeeded")
+
+        await self.webhook_handler(event)
+
+GATEWAYS: Dict[str, Type[PaymentGateway]] = {
+    "fake": FakePaymentGateway,
+}
+
+def get_payment_gateway(name: str) -> PaymentGateway:
+    """Instantiate the configured gateway adapter"""
+    gateway_class = GATEWAYS.get(name)
+
+    if gateway_class is None:
+        raise ValueError(f"Unknown PAYMENT_GATEWAY '{name}'. Available: {', '.join(GATEWAYS)}")
+
+    return gateway_class()
@@ -0,0 +1,331 @@
+import asyncio
+import logging
+import uuid
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple
+from core.config import settings
+from models.payment import PaymentWebhook
+from services.payment_gateway import get_payment_gateway
+from services.user_service import user_service
+from supabase_client.supabase_client import get_supabase_client, get_supabase_replica_clients
+from supabase_client.read_router import ReadRouter
+
+logger = logging.getLogger(__name__)
+
+# Statuses a gateway webhook may still resolve
+AWAITING_GATEWAY = ("processing", "awaiting_confirmation", "unknown")
+
+class PaymentService:
+    """
+    Asynchronous deposit/withdrawal pipeline.
+    Requests only create a job and enqueue it; a pool of workers talks to the
+    gateway, and confirmed webhooks are batched into one wallet write per user.
+
+    Jobs live in the payment_jobs table and every status change is a
+    conditional update (compare-and-set on the current status), so any pod can
+    take a webhook and a duplicate webhook is applied once. Money moves before
+    the status that records it, so a crash in between leaves the job in an
+    intermediate status; recover() flags those for reconciliation.
+    """
+
+    def __init__(self):
+        self.supabase = get_supabase_client()
+        self.db = ReadRouter(self.supabase, get_supabase_replica_clients())
+        self.gateway = get_payment_gateway(settings.PAYMENT_GATEWAY)
+        self.gateway.webhook_handler = self.handle_webhook
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+        # user_id -> [(job, amount, status before credit, status once credited)]
+        self._pending_credits: Dict[str, List[Tuple[dict, float, str, str]]] = {}
+
+    async def start(self):
+        """Start the worker pool and the credit flusher, then pick up stale jobs"""
+        if self.workers:
+            return
+
+        self.queue = asyncio.Queue(maxsize=settings.PAYMENT_QUEUE_SIZE)
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(settings.PAYMENT_WORKERS)]
+        self.workers.append(asyncio.create_task(self._flush_loop()))
+
+        await self._recover_safely()
+        self.workers.append(asyncio.create_task(self._recovery_loop()))
+
+    async def stop(self):
+        """Cancel workers and write out any credits still waiting for a batch"""
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+        await self._flush_credits()
+
+    async def recover(self):
+        """
+        Resume or flag jobs that stopped making progress: left behind by a pod
+        that stopped, or waiting on a webhook that never came. Runs on startup
+        and every PAYMENT_RECOVERY_AGE_SECONDS; every step is a conditional
+        update, so pods running it at the same time do not conflict.
+        Only jobs untouched for PAYMENT_RECOVERY_AGE_SECONDS are considered, so
+        jobs a live pod is still working on are left alone.
+        - queued: never reached the gateway, enqueue again
+        - processing: may have reached the gateway, wait for its webhook as unknown
+        - pending, settling, refunding: the wallet may or may not have been
+          written, so they need reconciliation rather than a retry
+        - awaiting_confirmation, unknown: the webhook never came (lost with a
+          restarted pod or never sent), so only the gateway can say what happened
+        """
+        cutoff = (datetime.utcnow() - timedelta(seconds=settings.PAYMENT_RECOVERY_AGE_SECONDS)).isoformat()
+        result = self.supabase.table('payment_jobs').select('*') \
+            .in_('status', ['queued', 'pending', 'settling', 'refunding', *AWAITING_GATEWAY]) \
+            .lt('updated_at', cutoff).execute()
+
+        for job in result.data or []:
+            if job["status"] == "queued":
+                # Re-enqueueing is safe: a worker only runs a job it can claim
+                self._enqueue(job)
+            elif job["status"] == "processing":
+                self._transition(job, ("processing",), status="unknown", error="Worker stopped before the gateway answered")
+            else:
+                logger.error("Payment job %s left in %s, needs reconciliation", job["id"], job["status"])
+                self._transition(job, (job["status"],), status="needs_reconciliation")
+
+    def is_busy(self) -> bool:
+        """True when the queue cannot take another job"""
+        return self.queue is None or self.queue.full()
+
+    async def get_job(self, job_id: str, user_id: str) -> Optional[dict]:
+        """Return a job if it exists and belongs to user_id"""
+        try:
+            # From the primary: workers on any pod update jobs outside the user's
+            # requests, so no read-your-writes marker would cover a replica read
+            result = self.db.read_primary(
+                lambda client: client.table('payment_jobs').select('*').eq('id', job_id).eq('user_id', user_id)
+            )
+        except Exception as e:
+            # Includes malformed ids rejected by the uuid column
+            logger.warning("Error fetching payment job: %s", e)
+            return None
+
+        return result.data[0] if result.data else None
+
+    async def create_deposit(self, user_id: str, amount: float) -> Tuple[Optional[dict], Optional[str]]:
+        """Queue a deposit; the wallet is credited once the gateway confirms"""
+        job = self._new_job(user_id, "deposit", amount, "queued")
+
+        if job is None:
+            return None, "Failed to create payment job"
+
+        if not self._enqueue(job):
+            self._transition(job, ("queued",), status="failed", error="Payment queue is full")
+            return None, "Payment queue is full"
+
+        return job, None
+
+    async def create_withdrawal(self, user_id: str, amount: float) -> Tuple[Optional[dict], Optional[str]]:
+        """Reserve funds and queue a withdrawal; funds are refunded if the payout is declined"""
+        # Persist first so reserved funds are always accounted for by a job
+        job = self._new_job(user_id, "withdrawal", amount, "pending")
+
+        if job is None:
+            return None, "Failed to create payment job"
+
+        try:
+            balance = await user_service.get_user_balance(user_id, consistent=True)
+
+            if balance is None:
+                error = "Wallet not found"
+            elif balance < amount:
+                error = "Insufficient balance"
+            elif not await user_service.update_user_balance(user_id, balance - amount):
+                error = "Failed to reserve funds"
+            else:
+                error = None
+
+        except Exception as e:
+            logger.exception("Withdrawal reservation error: %s", e)
+            # The write may have landed; leave the job pending for recover() to flag
+            return None, str(e)
+
+        if error:
+            self._transition(job, ("pending",), status="failed", error=error)
+            return None, error
+
+        if not self._transition(job, ("pending",), status="queued"):
+            return None, "Failed to update payment job"
+
+        if not self._enqueue(job):
+            self._refund(job, ("queued",), "Payment queue is full")
+            return None, "Payment queue is full"
+
+        return job, None
+
+    async def handle_webhook(self, event: PaymentWebhook):
+        """Apply a gateway confirmation; duplicates and late events are ignored"""
+        try:
+            result = self.supabase.table('payment_jobs').select('*').eq('id', event.job_id).execute()
+        except Exception as e:
+            logger.warning("Error loading payment job %s for webhook: %s", event.job_id, e)
+            return
+
+        if not result.data:
+            logger.warning("Payment webhook for unknown job: %s", event.job_id)
+            return
+
+        job = result.data[0]
+
+        if job["status"] not in AWAITING_GATEWAY:
+            return
+
+        if job["reference"] and job["reference"] != event.reference:
+            logger.warning("Payment webhook reference mismatch for job %s", job["id"])
+            return
+
+        if event.status == "succeeded":
+            if job["type"] == "deposit":
+                if self._transition(job, AWAITING_GATEWAY, status="settling", reference=event.reference, error=None):
+                    self._queue_credit(job, float(job["amount"]), "settling", "completed")
+            else:
+                self._transition(job, AWAITING_GATEWAY, status="completed", reference=event.reference, error=None)
+        else:
+            self._decline(job, AWAITING_GATEWAY, event.error or "Payment failed", reference=event.reference)
+
+    def _new_job(self, user_id: str, job_type: str, amount: float, status: str) -> Optional[dict]:
+        now = datetime.utcnow().isoformat()
+        job = {
+            "id": str(uuid.uuid4()),
+            "user_id": user_id,
+            "type": job_type,
+            "amount": amount,
+            "status": status,
+            "reference": None,
+            "error": None,
+            "created_at": now,
+            "updated_at": now
+        }
+
+        try:
+            result = self.supabase.table('payment_jobs').insert(job).execute()
+        except Exception as e:
+            logger.exception("Error creating payment job: %s", e)
+            return None
+
+        return job if result.data else None
+
+    def _transition(self, job: dict, from_statuses: Iterable[str], **fields) -> bool:
+        """
+        Persist a status change only if the job is still in one of from_statuses.
+        Returns False if another worker or pod got there first.
+        """
+        fields["updated_at"] = datetime.utcnow().isoformat()
+
+        try:
+            result = self.supabase.table('payment_jobs').update(fields) \
+                .eq('id', job["id"]).in_('status', list(from_statuses)).execute()
+        except Exception as e:
+            logger.exception("Error updating payment job %s: %s", job["id"], e)
+            return False
+
+        if not result.data:
+            return False
+
+        job.update(fields)
+        return True
+
+    def _enqueue(self, job: dict) -> bool:
+        if self.queue is None:
+            return False
+
+        try:
+            self.queue.put_nowait(job)
+            return True
+        except asyncio.QueueFull:
+            return False
+
+    def _decline(self, job: dict, from_statuses: Iterable[str], error: str, **fields):
+        """The gateway explicitly did not pay: fail deposits, refund withdrawals"""
+        if job["type"] == "withdrawal":
+            self._refund(job, from_statuses, error, **fields)
+        else:
+            self._transition(job, from_statuses, status="failed", error=error, **fields)
+
+    def _refund(self, job: dict, from_statuses: Iterable[str], error: str, **fields):
+        if self._transition(job, from_statuses, status="refunding", error=error, **fields):
+            self._queue_credit(job, float(job["amount"]), "refunding", "failed")
+
+    def _queue_credit(self, job: dict, amount: float, from_status: str, final_status: str):
+        self._pending_credits.setdefault(job["user_id"], []).append((job, amount, from_status, final_status))
+
+    async def _worker(self):
+        while True:
+            job = await self.queue.get()
+            try:
+                await self._process(job)
+            except Exception as e:
+                logger.exception("Payment worker error: %s", e)
+            finally:
+                self.queue.task_done()
+
+    async def _process(self, job: dict):
+        # Claim the job; fails if another pod's recovery already did
+        if not self._transition(job, ("queued",), status="processing"):
+            return
+
+        try:
+            reference, error = await asyncio.wait_for(
+                self.gateway.submit(job),
+                timeout=settings.PAYMENT_GATEWAY_TIMEOUT_SECONDS
+            )
+        except Exception as e:
+            # Timeouts and transport errors are ambiguous: the gateway may still pay out.
+            # Keep any reservation and wait for a webhook or manual reconciliation.
+            logger.warning("Payment gateway outcome unknown for job %s: %r", job["id"], e)
+            self._transition(job, ("processing",), status="unknown", error="Payment gateway did not respond; awaiting confirmation")
+            return
+
+        if error:
+            # An explicit decline: nothing was paid, so a withdrawal can be refunded
+            self._decline(job, ("processing",), error)
+            return
+
+        # The webhook may have raced ahead of submit() returning; then this is a no-op
+        self._transition(job, ("processing",), status="awaiting_confirmation", reference=reference)
+
+    async def _recover_safely(self):
+        try:
+            await self.recover()
+        except Exception as e:
+            logger.exception("Payment job recovery error: %s", e)
+
+    async def _recovery_loop(self):
+        while True:
+            await asyncio.sleep(settings.PAYMENT_RECOVERY_AGE_SECONDS)
+            await self._recover_safely()
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(settings.PAYMENT_CREDIT_BATCH_SECONDS)
+            try:
+                await self._flush_credits()
+            except Exception as e:
+                logger.exception("Payment credit flush error: %s", e)
+
+    async def _flush_credits(self):
+        """Apply all pending credits with one balance read and one write per user"""
+        if not self._pending_credits:
+            return
+
+        batch, self._pending_credits = self._pending_credits, {}
+
+        for user_id, entries in batch.items():
+            total = sum(amount for _, amount, _, _ in entries)
+            balance = await user_service.get_user_balance(user_id, consistent=True)
+
+            if balance is not None and await user_service.update_user_balance(user_id, balance + total):
+                for job, _, from_status, final_status in entries:
+                    if not self._transition(job, (from_status,), status=final_status):
+                        logger.error("Payment job %s credited but status not updated, needs reconciliation", job["id"])
+            else:
+                # Keep the credits for the next batch rather than losing them
+                logger.warning("Payment credit failed for user %s, retrying next batch", user_id)
+                self._pending_credits.setdefault(user_id, []).extend(entries)
+
+payment_service = PaymentService()
@@ -0,0 +1,131 @@
+import asyncio
+import zlib
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+BatchHandler = Callable[[str, List[Any]], Awaitable[List[Any]]]
+
+class SettlementQueue:
+    """
+    Per-key group commit.
+    Items are routed to one of N shards by key, so all items for a key are
+    handled by the same worker in arrival order. A worker collects what arrives
+    within window_ms, groups it by key and calls handler(key, items) once per
+    key; handler returns one result per item, in order.
+    """
+
+    def __init__(self, handler: BatchHandler, shards: int, window_ms: float, max_batch: int):
+        self.handler = handler
+        self.shards = shards
+        self.window = window_ms / 1000.0
+        self.max_batch = max_batch
+        self.queues: List[asyncio.Queue] = []
+        self.workers: List[asyncio.Task] = []
+        self._settling: Set[asyncio.Future] = set()
+        self._stopped = False
+
+    def start(self):
+        """
+        Start shard workers on the running loop.
+        The app calls this at startup so workers don't inherit a request's log
+        context; submit() also calls it, for use outside the app.
+        """
+        if self.workers:
+            return
+
+        self.queues = [asyncio.Queue() for _ in range(self.shards)]
+        self.workers = [asyncio.create_task(self._run_shard(queue)) for queue in self.queues]
+
+    async def stop(self):
+        """
+        Stop accepting items, let batches already being settled finish and
+        fail everything still queued so callers are not left waiting
+        """
+        self._stopped = True
+
+        for task in self.workers:
+            task.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        await asyncio.gather(*self._settling, return_exceptions=True)
+
+        for queue in self.queues:
+            while not queue.empty():
+                _, _, future = queue.get_nowait()
+                self._reject(future)
+
+        self.workers = []
+        self.queues = []
+
+    async def submit(self, key: str, item: Any) -> Any:
+        """Queue an item and wait for its settled result"""
+        if self._stopped:
+            raise RuntimeError("Settlement queue is shutting down")
+
+        self.start()
+
+        future = asyncio.get_running_loop().create_future()
+        # crc32 rather than hash(): stable across processes for easier debugging
+        shard = zlib.crc32(key.encode()) % self.shards
+        self.queues[shard].put_nowait((key, item, future))
+
+        return await future
+
+    async def _run_shard(self, queue: asyncio.Queue):
+        loop = asyncio.get_running_loop()
+
+        while True:
+            batch = [await queue.get()]
+            deadline = loop.time() + self.window
+
+            try:
+                while len(batch) < self.max_batch:
+                    # Take whatever already queued up, then wait out the window
+                    if not queue.empty():
+                        batch.append(queue.get_nowait())
+                        continue
+
+                    timeout = deadline - loop.time()
+                    if timeout <= 0:
+                        break
+                    try:
+                        batch.append(await asyncio.wait_for(queue.get(), timeout))
+                    except asyncio.TimeoutError:
+                        break
+            except asyncio.CancelledError:
+                # Nothing from this batch has touched the database yet
+                for _, _, future in batch:
+                    self._reject(future)
+                raise
+
+            groups: Dict[str, List[Tuple[Any, asyncio.Future]]] = {}
+            for key, item, future in batch:
+                groups.setdefault(key, []).append((item, future))
+
+            # Shielded: cancelling between the wallet write and the bets insert
+            # would leave the wallet changed with no bets recorded
+            settling = asyncio.gather(*(self._settle(key, entries) for key, entries in groups.items()))
+            self._settling.add(settling)
+            settling.add_done_callback(self._settling.discard)
+            await asyncio.shield(settling)
+
+    @staticmethod
+    def _reject(future: asyncio.Future):
+        if not future.done():
+            future.set_exception(RuntimeError("Settlement queue is shutting down"))
+
+    async def _settle(self, key: str, entries: List[Tuple[Any, asyncio.Future]]):
+        error: Optional[Exception] = None
+        results: List[Any] = []
+
+        try:
+            results = await self.handler(key, [item for item, _ in entries])
+        except Exception as e:
+            error = e
+
+        for index, (_, future) in enumerate(entries):
+            # The caller may have been cancelled (client disconnected)
+            if future.done():
+                continue
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(results[index])
@@ -1,32 +1,48 @@
+import logging
 from typing import Optional
-from supabase_client.supabase_client import get_supabase_client
+from supabase_client.supabase_client import get_supabase_client, get_supabase_replica_clients
+from supabase_client.read_router import ReadRouter
+
+logger = logging.getLogger(__name__)
 
 class UserService:
     def __init__(self):
         self.supabase = get_supabase_client()
+        self.db = ReadRouter(self.supabase, get_supabase_replica_clients())
     
-    async def get_user_balance(self, user_id: str) -> Optional[float]:
-        """Get user's wallet balance"""
+    async def get_user_balance(self, user_id: str, consistent: bool = False) -> Optional[float]:
+        """
+        Get user's wallet balance
+        Served from a replica unless consistent=True or the user wrote recently
+        """
         try:
-            result = self.supabase.table('wallets').select('balance').eq('user_id', user_id).execute()
+            query = lambda client: client.table('wallets').select('balance').eq('user_id', user_id)
+            
+            if consistent:
+                result = self.db.read_primary(query)
+            else:
+                result = self.db.read(query, user_id=user_id)
             
             if result.data:
                 return result.data[0]['balance']
             return None
             
         except Exception as e:
-            print(f"Error fetching balance: {e}")
+            logger.warning("Error fetching balance: %s", e)
             return None
     
     async def update_user_balance(self, user_id: str, new_balance: float) -> bool:
         """Update user's wallet balance"""
         try:
-            result = self.supabase.table('wallets').update({'balance': new_balance}).eq('user_id', user_id).execute()
+            result = self.db.write(
+                lambda client: client.table('wallets').update({'balance': new_balance}).eq('user_id', user_id),
+                user_id=user_id
+            )
             
             return bool(result.data)
             
         except Exception as e:
-            print(f"Error updating balance: {e}")
+            logger.warning("Error updating balance: %s", e)
             return False
 
-user_service = UserService()
\ No newline at end of file
+user_service = UserService()
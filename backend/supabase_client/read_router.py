@@ -0,0 +1,215 @@
+import hashlib
+import hmac
+import logging
+import math
+import time
+import threading
+from contextvars import ContextVar
+from http.cookies import CookieError, SimpleCookie
+from typing import Any, Callable, Dict, List, Optional, Tuple
+from supabase import Client
+from core.config import settings
+
+logger = logging.getLogger(__name__)
+
+# Per-request write marker, set by ReadYourWritesMiddleware:
+# {"client_last_write": (epoch seconds, signature) sent by the client,
+#  "wrote_at": epoch seconds of a write in this request, "user_id": who wrote}
+write_marker: ContextVar[Optional[dict]] = ContextVar("write_marker", default=None)
+
+LAST_WRITE_COOKIE = "last_write"
+LAST_WRITE_HEADER = "x-last-write"
+
+class RecentWrites:
+    """
+    Tracks users who wrote recently so their reads stay on the primary
+    until replicas have had time to catch up (read-your-writes).
+
+    The local map only covers writes made by this pod. For other pods, the
+    write time also travels with the user: ReadYourWritesMiddleware returns
+    it as a cookie and X-Last-Write header, and honours it on later requests.
+    The marker is signed for the user who wrote, so a client cannot mint
+    fresh ones to keep its reads on the primary, or apply one to another user.
+    Wall-clock time is used so the marker means the same thing on every pod.
+    """
+
+    def __init__(self, window_seconds: float):
+        self.window_seconds = window_seconds
+        self._writes: Dict[str, float] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, user_id: str) -> None:
+        """Record that user_id just wrote to the primary"""
+        now = time.time()
+        with self._lock:
+            self._writes[user_id] = now
+            # Prune lazily so the map only holds users inside the window
+            if len(self._writes) > 10000:
+                cutoff = now - self.window_seconds
+                self._writes = {uid: ts for uid, ts in self._writes.items() if ts > cutoff}
+
+        # Inside a request: hand the marker back to the client
+        marker = write_marker.get()
+        if marker is not None:
+            marker["wrote_at"] = now
+            marker["user_id"] = user_id
+
+    def is_recent(self, user_id: str) -> bool:
+        """Check whether user_id wrote within the stickiness window, on any pod"""
+        now = time.time()
+        with self._lock:
+            written_at = self._writes.get(user_id)
+        if written_at is not None and now - written_at < self.window_seconds:
+            return True
+
+        marker = write_marker.get()
+        client_last_write = marker.get("client_last_write") if marker else None
+        if client_last_write is None:
+            return False
+
+        written_at, signature = client_last_write
+        return now - written_at < self.window_seconds and verify_last_write(user_id, written_at, signature)
+
+# Shared across services: a bet written by BetService pins UserService reads
+recent_writes = RecentWrites(settings.READ_YOUR_WRITES_SECONDS)
+
+def _last_write_signature(user_id: str, written_at: float) -> str:
+    message = f"{user_id}:{written_at:.3f}".encode()
+    return hmac.new(settings.SECRET_KEY.encode(), message, hashlib.sha256).hexdigest()
+
+def sign_last_write(user_id: str, written_at: float) -> str:
+    """Marker value handed to the client: '<epoch seconds>.<signature>'"""
+    return f"{written_at:.3f}.{_last_write_signature(user_id, written_at)}"
+
+def verify_last_write(user_id: str, written_at: float, signature: str) -> bool:
+    expected = _last_write_signature(user_id, written_at)
+    return hmac.compare_digest(signature.encode(), expected.encode())
+
+def parse_last_write(value: Optional[str]) -> Optional[Tuple[float, str]]:
+    """
+    Split a client-supplied marker into (write time, signature), rejecting
+    garbage and future times. The signature is checked per user in is_recent().
+    """
+    try:
+        timestamp, signature = value.rsplit(".", 1)
+        written_at = float(timestamp)
+    except (AttributeError, TypeError, ValueError):
+        return None
+    # Allow a little clock skew between pods; a far-future value would pin reads forever
+    if not math.isfinite(written_at) or written_at > time.time() + 5:
+        return None
+    return written_at, signature
+
+class ReadYourWritesMiddleware:
+    """
+    ASGI middleware carrying the last-write time with the user across pods.
+    Reads the last_write cookie or X-Last-Write header into the request
+    context, and sets both, signed for the user who wrote, on responses to
+    requests that wrote.
+    """
+
+    def __init__(self, app, window_seconds: float = settings.READ_YOUR_WRITES_SECONDS):
+        self.app = app
+        self.window_seconds = window_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        raw = headers.get(LAST_WRITE_HEADER.encode())
+        if raw is None:
+            cookies = SimpleCookie()
+            try:
+                cookies.load(headers.get(b"cookie", b"").decode("latin-1"))
+            except CookieError:
+                pass
+            morsel = cookies.get(LAST_WRITE_COOKIE)
+            raw = morsel.value if morsel else None
+        elif isinstance(raw, bytes):
+            raw = raw.decode("latin-1")
+
+        marker = {"client_last_write": parse_last_write(raw), "wrote_at": None, "user_id": None}
+
+        async def send_with_marker(message):
+            if message["type"] == "http.response.start" and marker["wrote_at"] is not None:
+                value = sign_last_write(marker["user_id"], marker["wrote_at"])
+                cookie = f"{LAST_WRITE_COOKIE}={value}; Max-Age={int(math.ceil(self.window_seconds))}; Path=/; HttpOnly; SameSite=Lax"
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"set-cookie", cookie.encode("latin-1")),
+                    (LAST_WRITE_HEADER.encode(), value.encode("latin-1")),
+                ]
+            await send(message)
+
+        token = write_marker.set(marker)
+        try:
+            await self.app(scope, receive, send_with_marker)
+        finally:
+            write_marker.reset(token)
+
+class ReadRouter:
+    """
+    Routes read queries to replicas (round robin) and writes to the primary.
+    A replica that raises is taken out of rotation for REPLICA_RETRY_SECONDS
+    and the read is retried on the primary.
+    """
+
+    def __init__(
+        self,
+        primary: Client,
+        replicas: List[Client],
+        writes: RecentWrites = recent_writes,
+        retry_seconds: float = settings.REPLICA_RETRY_SECONDS
+    ):
+        self.primary = primary
+        self.replicas = replicas
+        self.writes = writes
+        self.retry_seconds = retry_seconds
+        self._down_until = [0.0] * len(replicas)
+        self._next = 0
+        self._lock = threading.Lock()
+
+    def _pick_replica(self) -> Optional[int]:
+        """Return the index of the next healthy replica, if any"""
+        now = time.monotonic()
+        with self._lock:
+            for _ in range(len(self.replicas)):
+                index = self._next
+                self._next = (self._next + 1) % len(self.replicas)
+                if self._down_until[index] <= now:
+                    return index
+        return None
+
+    def _mark_down(self, index: int) -> None:
+        with self._lock:
+            self._down_until[index] = time.monotonic() + self.retry_seconds
+
+    def read(self, build_query: Callable[[Client], Any], user_id: Optional[str] = None) -> Any:
+        """
+        Execute a read that tolerates replica lag.
+        build_query receives a client and returns an unexecuted query builder.
+        """
+        if user_id is None or not self.writes.is_recent(user_id):
+            index = self._pick_replica() if self.replicas else None
+            if index is not None:
+                try:
+                    return build_query(self.replicas[index]).execute()
+                except Exception as e:
+                    logger.warning("Replica read error, falling back to primary: %s", e)
+                    self._mark_down(index)
+
+        return build_query(self.primary).execute()
+
+    def read_primary(self, build_query: Callable[[Client], Any]) -> Any:
+        """Execute a read that must see the latest committed data"""
+        return build_query(self.primary).execute()
+
+    def write(self, build_query: Callable[[Client], Any], user_id: Optional[str] = None) -> Any:
+        """Execute a write on the primary and pin user_id's reads to it"""
+        try:
+            return build_query(self.primary).execute()
+        finally:
+            # Mark even on error: the write may have landed before the client failed
+            if user_id is not None:
+                self.writes.mark(user_id)
@@ -1,6 +1,11 @@
+import logging
 from supabase import create_client, Client
 from core.config import settings
 import os
+from typing import List
+
+logger = logging.getLogger(__name__)
+
 
 def get_supabase_client() -> Client:
     """Initialize and return Supabase client"""
@@ -13,10 +18,10 @@ def get_supabase_client() -> Client:
     try:
         return create_client(supabase_url, supabase_key)
     except Exception as e:
-        print(f"Error creating Supabase client: {e}")
-        print(f"Supabase URL: {supabase_url[:30]}..." if supabase_url else "Supabase URL: Not set")
+        logger.error("Error creating Supabase client: %s (URL: %s...)", e, supabase_url[:30])
         raise
 
+
 def get_supabase_admin_client() -> Client:
     """Initialize and return Supabase admin client with service key"""
     supabase_url = os.getenv("SUPABASE_URL") or settings.SUPABASE_URL
@@ -28,6 +33,22 @@ def get_supabase_admin_client() -> Client:
     try:
         return create_client(supabase_url, supabase_service_key)
     except Exception as e:
-        print(f"Error creating Supabase admin client: {e}")
-        print(f"Supabase URL: {supabase_url[:30]}..." if supabase_url else "Supabase URL: Not set")
-        raise
\ No newline at end of file
+        logger.error("Error creating Supabase admin client: %s (URL: %s...)", e, supabase_url[:30])
+        raise
+
+
+def get_supabase_replica_clients(admin: bool = False) -> List[Client]:
+    """Initialize and return Supabase clients for the configured read replicas"""
+    if admin:
+        supabase_key = os.getenv("SUPABASE_SERVICE_KEY") or settings.SUPABASE_SERVICE_KEY
+    else:
+        supabase_key = os.getenv("SUPABASE_KEY") or settings.SUPABASE_KEY
+    
+    clients = []
+    for replica_url in settings.SUPABASE_REPLICA_URLS:
+        try:
+            clients.append(create_client(replica_url, supabase_key))
+        except Exception as e:
+            # A broken replica must not take the service down; reads fall back to primary
+            logger.error("Error creating Supabase replica client: %s (URL: %s...)", e, replica_url[:30])
+    return clients
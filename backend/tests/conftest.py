@@ -0,0 +1,12 @@
+import os
+import sys
+
+# Tests import modules the way uvicorn does, from the backend directory
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# Settings() requires these and the client only checks the key is JWT-shaped;
+# tests never talk to Supabase
+TEST_KEY = "eyJhbGciOiJIUzI1NiJ9.eyJyb2xlIjoiYW5vbiJ9.test"
+os.environ.setdefault("SUPABASE_URL", "https://test.supabase.co")
+os.environ.setdefault("SUPABASE_KEY", TEST_KEY)
+os.environ.setdefault("SUPABASE_SERVICE_KEY", TEST_KEY)
@@ -0,0 +1,84 @@
+import copy
+import uuid
+from typing import Callable, Dict, List, Optional
+
+class FakeResult:
+    def __init__(self, data: list):
+        self.data = data
+
+class FakeQuery:
+    """The subset of the PostgREST query builder the services use"""
+
+    def __init__(self, client: "FakeSupabase", table: str):
+        self.client = client
+        self.table = table
+        self.action = "select"
+        self.payload = None
+        self.filters: List[Callable[[dict], bool]] = []
+
+    def select(self, columns: str = "*"):
+        self.action = "select"
+        return self
+
+    def insert(self, rows):
+        self.action = "insert"
+        self.payload = rows
+        return self
+
+    def update(self, fields: dict):
+        self.action = "update"
+        self.payload = fields
+        return self
+
+    def eq(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) == value)
+        return self
+
+    def in_(self, column: str, values):
+        values = list(values)
+        self.filters.append(lambda row: row.get(column) in values)
+        return self
+
+    def lt(self, column: str, value):
+        self.filters.append(lambda row: row.get(column) is not None and row.get(column) < value)
+        return self
+
+    def execute(self) -> FakeResult:
+        self.client.calls.append((self.table, self.action))
+        failure = self.client.failures.get((self.table, self.action))
+        if failure:
+            self.client.failures[(self.table, self.action)] -= 1
+            raise RuntimeError(f"{self.action} on {self.table} failed")
+
+        rows = self.client.tables.setdefault(self.table, [])
+
+        if self.action == "insert":
+            new_rows = self.payload if isinstance(self.payload, list) else [self.payload]
+            inserted = []
+            for row in new_rows:
+                row = dict(row)
+                row.setdefault("id", str(uuid.uuid4()))
+                rows.append(row)
+                inserted.append(copy.deepcopy(row))
+            return FakeResult(inserted)
+
+        matched = [row for row in rows if all(check(row) for check in self.filters)]
+        if self.action == "update":
+            for row in matched:
+                row.update(self.payload)
+        return FakeResult([copy.deepcopy(row) for row in matched])
+
+class FakeSupabase:
+    """In-memory stand-in for a Supabase client; tables are lists of dicts"""
+
+    def __init__(self, tables: Optional[Dict[str, List[dict]]] = None):
+        self.tables = tables if tables is not None else {}
+        self.calls: List[tuple] = []
+        # (table, action) -> number of upcoming executions that raise
+        self.failures: Dict[tuple, int] = {}
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def fail(self, table: str, action: str, times: int = 1):
+        self.failures[(table, action)] = times
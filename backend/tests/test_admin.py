@@ -0,0 +1,36 @@
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import settings
+from core.security import tokens_match
+from routers import admin
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(settings, "PROFILER_TOKEN", "profiler-secret")
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    return TestClient(app)
+
+def test_tokens_match():
+    assert tokens_match("secret", "secret")
+    assert not tokens_match("secret", "other")
+    assert not tokens_match(None, "secret")
+    assert not tokens_match("", "")
+    assert not tokens_match("t\xe9k", "secret")
+    assert tokens_match("t\xe9k", "t\xe9k")
+
+@pytest.mark.parametrize("path, header", [
+    ("/admin/anomalies", "X-Admin-Token"),
+    ("/admin/profiles", "X-Profile-Token"),
+])
+def test_non_ascii_token_is_not_found(client, path, header):
+    # Starlette decodes header bytes as latin-1, so this reaches the check as "t\xe9k"
+    response = client.get(path, headers={header: "t\xe9k".encode("latin-1")})
+
+    assert response.status_code == 404
+
+def test_profiles_require_profiler_token(client):
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": "admin-secret"}).status_code == 404
+    assert client.get("/admin/profiles", headers={"X-Profile-Token": "profiler-secret"}).status_code == 200
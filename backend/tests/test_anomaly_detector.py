@@ -0,0 +1,114 @@
+import json
+import os
+import subprocess
+import sys
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import settings
+from routers import admin
+from services.anomaly_detector import AnomalyDetector
+
+START = 1767225600.0  # 2026-01-01T00:00:00Z
+
+def make_detector() -> AnomalyDetector:
+    return AnomalyDetector(
+        burst_rate=1.0,
+        rate_window_seconds=30.0,
+        high_stake=500.0,
+        hot_user_threshold=300,
+        window_seconds=60.0
+    )
+
+def martingale_session(user_id: str, start: float):
+    """Stake doubles after every loss, one bet every 10 seconds"""
+    amount = 10.0
+    for i in range(6):
+        yield user_id, 1, amount, "loss", start + 10 * i
+        amount *= 2
+
+def test_replay_is_reproducible():
+    events = list(martingale_session("bot", START)) + [
+        ("regular", 2, 20.0, "win", START + 5),
+        ("regular", 3, 20.0, "loss", START + 65),
+    ]
+    events.sort(key=lambda event: event[4])
+
+    first = make_detector().replay(events)
+    second = make_detector().replay(events)
+
+    assert first == second
+    assert [(flag["user_id"], flag["kind"]) for flag in first] == [("bot", "martingale")]
+    # Flag time is the time of the bet that raised it, not of the replay
+    assert first[0]["flagged_at"] == START + 30
+    assert first[0]["detail"] == {"streak": 3, "amount": 80.0}
+
+def test_burst_is_flagged_once_per_cooldown():
+    events = [("fast", 1 + i % 4, 5.0, "loss", START + i * 0.5) for i in range(120)]
+
+    flags = make_detector().replay(events)
+
+    assert [flag["kind"] for flag in flags] == ["burst"]
+    assert START < flags[0]["flagged_at"] < START + 60
+
+def test_same_horse_high_stakes():
+    events = [("whale", 4, 600.0, "win", START + 20 * i) for i in range(5)]
+
+    flags = make_detector().replay(events)
+
+    assert [(flag["kind"], flag["flagged_at"]) for flag in flags] == [("same_horse_high_stake", START + 80)]
+
+def test_anomalies_endpoint_requires_admin_token(monkeypatch):
+    monkeypatch.setattr(settings, "ADMIN_TOKEN", "admin-secret")
+    monkeypatch.setattr(settings, "PROFILER_TOKEN", "profiler-secret")
+    app = FastAPI()
+    app.include_router(admin.router, prefix="/admin")
+    client = TestClient(app)
+
+    assert client.get("/admin/anomalies").status_code == 404
+    assert client.get("/admin/anomalies", headers={"X-Admin-Token": "profiler-secret"}).status_code == 404
+    assert client.get("/admin/anomalies", headers={"X-Profile-Token": "profiler-secret"}).status_code == 404
+
+    response = client.get("/admin/anomalies", headers={"X-Admin-Token": "admin-secret"})
+    assert response.status_code == 200
+    assert set(response.json()) == {"tracked_users", "flags"}
+
+def crowd(users: int, bets_each: int, start: float):
+    """Many users betting at once, one bet per user per second"""
+    for second in range(bets_each):
+        for user in range(users):
+            yield f"user-{user}", 1 + user % 4, 10.0, "loss", start + second + user / (users * 10)
+
+def test_hot_user_is_flagged():
+    detector = AnomalyDetector(hot_user_threshold=50, burst_rate=1000.0, window_seconds=60.0)
+    events = list(crowd(20, 30, START))
+    events += [("heavy", 1, 5.0, "loss", START + 40 + i * 0.1) for i in range(60)]
+    events.sort(key=lambda event: event[4])
+
+    flags = detector.replay(events)
+
+    assert [(flag["user_id"], flag["kind"]) for flag in flags] == [("heavy", "hot_user")]
+
+REPLAY_SCRIPT = """
+import json, sys
+sys.path.insert(0, {backend!r})
+sys.path.insert(0, {tests!r})
+import conftest
+from services.anomaly_detector import AnomalyDetector
+from test_anomaly_detector import START, crowd
+# A narrow sketch so users collide and estimates depend on the hash
+detector = AnomalyDetector(hot_user_threshold=40, burst_rate=1000.0, sketch_width=8)
+print(json.dumps(detector.replay(crowd(40, 30, START))))
+"""
+
+def test_hot_user_replay_is_the_same_in_every_process():
+    backend = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    script = REPLAY_SCRIPT.format(backend=backend, tests=os.path.join(backend, "tests"))
+
+    outputs = []
+    for seed in ("1", "2"):
+        env = dict(os.environ, PYTHONHASHSEED=seed)
+        completed = subprocess.run([sys.executable, "-c", script], env=env, capture_output=True, text=True, check=True)
+        outputs.append(json.loads(completed.stdout.strip().splitlines()[-1]))
+
+    assert outputs[0] == outputs[1]
+    assert any(flag["kind"] == "hot_user" for flag in outputs[0])
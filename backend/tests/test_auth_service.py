@@ -0,0 +1,52 @@
+import asyncio
+import pytest
+from core.security import hash_password
+from models.user import UserCreate, UserLogin
+from services.auth_service import AuthService
+from supabase_client.read_router import ReadRouter, RecentWrites
+from fake_supabase import FakeSupabase
+
+@pytest.fixture
+def service():
+    service = AuthService.__new__(AuthService)
+    service.supabase = FakeSupabase()
+    service.replica = FakeSupabase()  # Lags: never receives the primary's writes
+    service.writes = RecentWrites(window_seconds=5)
+    service.db = ReadRouter(service.supabase, [service.replica], writes=service.writes)
+    return service
+
+def test_login_right_after_registration_falls_back_to_primary(service):
+    user, error = asyncio.run(service.register_user(
+        UserCreate(username="newuser", email="new@example.com", password="hello123")
+    ))
+    assert error is None
+
+    found, token, error = asyncio.run(service.authenticate_user(UserLogin(username="newuser", password="hello123")))
+
+    assert error is None
+    assert found["id"] == user["id"]
+    assert token
+
+def test_registration_marks_the_new_user(service):
+    user, _ = asyncio.run(service.register_user(
+        UserCreate(username="newuser", email="new@example.com", password="hello123")
+    ))
+
+    wallet, = service.supabase.tables["wallets"]
+    assert (wallet["user_id"], wallet["balance"]) == (user["id"], 1000.0)
+    assert service.writes.is_recent(user["id"])
+
+def test_login_uses_replica_when_it_has_the_user(service):
+    service.replica.tables["users"] = [{
+        "id": "u1", "username": "old", "email": "old@example.com", "password_hash": hash_password("hello123")
+    }]
+
+    found, _, error = asyncio.run(service.authenticate_user(UserLogin(username="old", password="hello123")))
+
+    assert error is None and found["id"] == "u1"
+    assert service.supabase.calls == []
+
+def test_unknown_user_is_rejected(service):
+    _, _, error = asyncio.run(service.authenticate_user(UserLogin(username="nobody", password="hello123")))
+
+    assert error == "Invalid username or password"
@@ -0,0 +1,113 @@
+import asyncio
+from datetime import datetime, timezone
+import pytest
+from core.config import settings
+from models.bet import BetCreate
+from services import bet_service as bet_module
+from services.bet_service import BetService
+from services.settlement_queue import SettlementQueue
+from services.user_service import UserService
+from supabase_client.read_router import ReadRouter, RecentWrites
+from fake_supabase import FakeSupabase
+
+@pytest.fixture
+def db():
+    return FakeSupabase({"wallets": [{"id": "w1", "user_id": "u1", "balance": 100.0}], "bets": []})
+
+@pytest.fixture
+def service(db, monkeypatch):
+    writes = RecentWrites(window_seconds=5)
+
+    users = UserService.__new__(UserService)
+    users.supabase = db
+    users.db = ReadRouter(db, [], writes=writes)
+    monkeypatch.setattr(bet_module, "user_service", users)
+    monkeypatch.setattr(settings, "ANOMALY_DETECTION_ENABLED", False)
+    # Horse 1 always wins
+    monkeypatch.setattr(bet_module.random, "randint", lambda low, high: 1)
+
+    service = BetService.__new__(BetService)
+    service.supabase = db
+    service.db = ReadRouter(db, [], writes=writes)
+    service.win_multiplier = 2.0
+    service.settlement = SettlementQueue(service.settle_horse_bets, shards=2, window_ms=20, max_batch=50)
+    return service
+
+def bet(horse: int, amount: float) -> BetCreate:
+    return BetCreate(horse_choice=horse, bet_amount=amount)
+
+def balance(db) -> float:
+    return db.tables["wallets"][0]["balance"]
+
+def test_batch_settles_in_order_with_running_balance(service, db):
+    bets = [bet(2, 60.0), bet(3, 50.0), bet(1, 30.0), bet(4, 10.0)]
+
+    results = asyncio.run(service.settle_horse_bets("u1", bets))
+
+    # 100 - 60 = 40; 50 is more than 40; 40 + 60 = 100; 100 - 10 = 90
+    assert results[1] == {"error": "Insufficient balance"}
+    assert [result["new_balance"] for result in (results[0], results[2], results[3])] == [40.0, 100.0, 90.0]
+    assert [result["result"] for result in (results[0], results[2], results[3])] == ["loss", "win", "loss"]
+    assert balance(db) == 90.0
+    assert [row["bet_amount"] for row in db.tables["bets"]] == [60.0, 30.0, 10.0]
+    assert db.calls.count(("wallets", "update")) == 1
+    assert db.calls.count(("bets", "insert")) == 1
+
+def test_nothing_is_written_when_every_bet_is_refused(service, db):
+    results = asyncio.run(service.settle_horse_bets("u1", [bet(1, 150.0)]))
+
+    assert results == [{"error": "Insufficient balance"}]
+    assert ("wallets", "update") not in db.calls
+
+def test_failed_wallet_write_fails_the_settled_bets(service, db):
+    db.fail("wallets", "update")
+
+    results = asyncio.run(service.settle_horse_bets("u1", [bet(2, 10.0), bet(1, 500.0)]))
+
+    assert results == [{"error": "Failed to update balance"}, {"error": "Insufficient balance"}]
+    assert db.tables["bets"] == []
+
+def test_failed_insert_is_reported_to_every_caller(service, db):
+    db.fail("bets", "insert")
+
+    async def main():
+        results = await asyncio.gather(*(service.place_horse_bet("u1", bet(2, 10.0)) for _ in range(3)))
+        await service.settlement.stop()
+        return results
+
+    results = asyncio.run(main())
+
+    assert all("error" in result for result in results)
+    assert db.tables["bets"] == []
+
+def test_concurrent_bets_share_one_balance_read_and_write(service, db):
+    async def main():
+        results = await asyncio.gather(*(service.place_horse_bet("u1", bet(2, 10.0)) for _ in range(5)))
+        await service.settlement.stop()
+        return results
+
+    results = asyncio.run(main())
+
+    assert [result["new_balance"] for result in results] == [90.0, 80.0, 70.0, 60.0, 50.0]
+    assert balance(db) == 50.0
+    assert db.calls.count(("wallets", "select")) == 1
+    assert db.calls.count(("wallets", "update")) == 1
+
+def test_detector_sees_each_bet_with_its_own_time_after_settlement(service, db, monkeypatch):
+    monkeypatch.setattr(settings, "ANOMALY_DETECTION_ENABLED", True)
+    observed = []
+    monkeypatch.setattr(bet_module.anomaly_detector, "observe", lambda *args, now: observed.append((args, now)))
+
+    async def main():
+        results = await service.settle_horse_bets("u1", [bet(2, 10.0), bet(1, 20.0)])
+        # Scheduled with call_soon, so nothing has run yet
+        assert observed == []
+        await asyncio.sleep(0)
+        return results
+
+    results = asyncio.run(main())
+
+    assert [args for args, _ in observed] == [("u1", 2, 10.0, "loss"), ("u1", 1, 20.0, "win")]
+    for (_, now), result in zip(observed, results):
+        created_at = datetime.fromisoformat(result["created_at"]).replace(tzinfo=timezone.utc)
+        assert now == created_at.timestamp()
@@ -0,0 +1,73 @@
+import random
+from core.load_shedding import AdaptiveLimiter, PRIORITY_LOW, PRIORITY_NORMAL
+
+def make_limiter(**kwargs) -> AdaptiveLimiter:
+    options = dict(initial_limit=20, min_limit=4, max_limit=200, tolerance=2.0, window_seconds=1.0)
+    options.update(kwargs)
+    return AdaptiveLimiter(**options)
+
+def replay(limiter: AdaptiveLimiter, latencies, concurrency: int, priority: int = PRIORITY_NORMAL, start: float = 0.0) -> float:
+    """
+    Drive the limiter with `concurrency` requests in flight at a time.
+    Each request occupies its slot for its latency; the clock advances by
+    latency / concurrency per completion. Returns the final clock.
+    """
+    now = start
+    for latency in latencies:
+        admitted = [limiter.try_acquire(priority) for _ in range(concurrency)]
+        for ok in admitted:
+            if ok:
+                now += latency / concurrency
+                limiter.release(priority, latency, now=now)
+    return now
+
+def test_idle_pod_keeps_its_limit_despite_noisy_latency():
+    rng = random.Random(42)
+    limiter = make_limiter()
+    latencies = [rng.lognormvariate(-3.9, 0.8) for _ in range(5000)]  # ~20ms median, long tail
+
+    replay(limiter, latencies, concurrency=1)
+
+    assert limiter.limit == 20
+    assert limiter.shed_count == 0
+
+def test_burst_after_quiet_period_is_admitted():
+    rng = random.Random(7)
+    limiter = make_limiter()
+    replay(limiter, [rng.lognormvariate(-3.9, 0.8) for _ in range(2000)], concurrency=1)
+
+    assert all(limiter.try_acquire(PRIORITY_NORMAL) for _ in range(5))
+    assert all(limiter.try_acquire(PRIORITY_LOW) for _ in range(3))
+
+def test_saturated_with_stable_latency_grows():
+    limiter = make_limiter()
+
+    replay(limiter, [0.02] * 3000, concurrency=25)
+
+    assert limiter.limit > 20
+
+def test_saturated_with_rising_latency_shrinks_and_respects_floor():
+    limiter = make_limiter()
+    now = replay(limiter, [0.02] * 1000, concurrency=25)
+    before = limiter.limit
+
+    # Backend degrades 10x for a few seconds while the pod is saturated
+    replay(limiter, [0.2] * 100, concurrency=40, start=now)
+
+    assert limiter.limit < before
+    assert limiter.limit >= 4
+
+def test_limit_changes_at_most_once_per_window():
+    limiter = make_limiter()
+    limits = set()
+    now = 0.0
+    # 0.5s of saturated, very slow responses: less than one window
+    for _ in range(50):
+        for _ in range(25):
+            limiter.try_acquire(PRIORITY_NORMAL)
+        for _ in range(25):
+            now += 0.0004
+            limiter.release(PRIORITY_NORMAL, 1.0 if now > 0.1 else 0.01, now=now)
+            limits.add(limiter.limit)
+
+    assert limits == {20.0}
@@ -0,0 +1,77 @@
+import io
+import json
+import logging
+import queue
+import pytest
+from core.logging_config import UVICORN_LOGGERS, DropReportingListener, DroppingQueueHandler, JsonFormatter, setup_logging, shutdown_logging
+
+def make_logging(queue_size: int):
+    log_queue: queue.Queue = queue.Queue(maxsize=queue_size)
+    handler = DroppingQueueHandler(log_queue)
+    output = io.StringIO()
+    stream_handler = logging.StreamHandler(output)
+    stream_handler.setFormatter(JsonFormatter())
+    listener = DropReportingListener(log_queue, handler, stream_handler, interval=60.0)
+    return handler, listener, output
+
+def emit(handler: DroppingQueueHandler, count: int):
+    for i in range(count):
+        handler.handle(logging.LogRecord("test", logging.INFO, __file__, 0, "message %d", (i,), None))
+
+def test_full_queue_drops_instead_of_blocking():
+    handler, _, _ = make_logging(queue_size=5)
+
+    emit(handler, 8)
+
+    assert handler.dropped == 3
+
+def test_dropped_records_are_reported_by_the_writer():
+    handler, listener, output = make_logging(queue_size=5)
+    emit(handler, 8)
+
+    listener.start()
+    listener.stop()
+
+    entries = [json.loads(line) for line in output.getvalue().splitlines()]
+    assert [entry["message"] for entry in entries[:5]] == [f"message {i}" for i in range(5)]
+    assert entries[-1]["level"] == "WARNING"
+    assert entries[-1]["message"] == "Log queue full, dropped 3 records (3 since start)"
+
+def test_report_is_rate_limited_and_only_covers_new_drops():
+    handler, listener, output = make_logging(queue_size=5)
+    emit(handler, 8)
+    listener.report_dropped(force=True)
+
+    # Within the interval: nothing new is written
+    emit(handler, 2)
+    listener.report_dropped()
+    assert len(output.getvalue().splitlines()) == 1
+
+    listener.report_dropped(force=True)
+    last = json.loads(output.getvalue().splitlines()[-1])
+    assert last["message"] == "Log queue full, dropped 2 records (5 since start)"
+
+@pytest.fixture
+def restore_logging():
+    names = ("", "httpx") + UVICORN_LOGGERS
+    saved = {name: (logging.getLogger(name).handlers[:], logging.getLogger(name).propagate, logging.getLogger(name).level) for name in names}
+    yield
+    shutdown_logging()
+    for name, (handlers, propagate, level) in saved.items():
+        logger = logging.getLogger(name)
+        logger.handlers, logger.propagate, logger.level = handlers, propagate, level
+
+def test_uvicorn_and_httpx_logs_go_through_the_queue(restore_logging):
+    # As left by uvicorn's default LOGGING_CONFIG
+    for name in ("uvicorn", "uvicorn.access"):
+        logging.getLogger(name).handlers = [logging.StreamHandler(io.StringIO())]
+        logging.getLogger(name).propagate = False
+
+    setup_logging()
+
+    root_handler, = logging.getLogger().handlers
+    assert isinstance(root_handler, DroppingQueueHandler)
+    for name in UVICORN_LOGGERS:
+        assert logging.getLogger(name).handlers == []
+        assert logging.getLogger(name).propagate
+    assert not logging.getLogger("httpx").isEnabledFor(logging.INFO)
@@ -0,0 +1,79 @@
+import hashlib
+import hmac
+import json
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from core.config import settings
+from core.security import get_current_user
+from routers import bets, payment
+from services.payment_service import payment_service
+
+SECRET = "webhook-secret"
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_WEBHOOK_SECRET", SECRET)
+    app = FastAPI()
+    app.include_router(payment.router, prefix="/payment")
+    app.include_router(bets.router, prefix="/bets")
+    app.dependency_overrides[get_current_user] = lambda: {"user_id": "u1", "username": "user"}
+    return TestClient(app)
+
+@pytest.fixture
+def handled(monkeypatch):
+    events = []
+
+    async def handle_webhook(event):
+        events.append(event)
+
+    monkeypatch.setattr(payment_service, "handle_webhook", handle_webhook)
+    return events
+
+def sign(body: bytes) -> str:
+    return hmac.new(SECRET.encode(), body, hashlib.sha256).hexdigest()
+
+BODY = json.dumps({"job_id": "job-1", "reference": "ref-1", "status": "succeeded"}).encode()
+
+def test_signed_webhook_is_handled(client, handled):
+    response = client.post("/payment/webhook", content=BODY, headers={"X-Webhook-Signature": sign(BODY)})
+
+    assert response.status_code == 200
+    assert [event.job_id for event in handled] == ["job-1"]
+
+@pytest.mark.parametrize("signature", [None, "0" * 64, "t\xe9k".encode("latin-1")])
+def test_bad_signature_is_unauthorized(client, handled, signature):
+    headers = {} if signature is None else {"X-Webhook-Signature": signature}
+
+    response = client.post("/payment/webhook", content=BODY, headers=headers)
+
+    assert response.status_code == 401
+    assert handled == []
+
+@pytest.mark.parametrize("amount", ["NaN", "Infinity", "-Infinity"])
+def test_non_finite_amount_is_rejected(client, amount):
+    body = '{"amount": %s}' % amount
+
+    response = client.post("/payment/deposit", content=body, headers={"Content-Type": "application/json"})
+
+    assert response.status_code == 422
+    assert all("input" not in error for error in response.json()["detail"])
+
+@pytest.mark.parametrize("amount", [0, -5])
+def test_non_positive_amount_is_rejected(client, amount):
+    response = client.post("/payment/withdraw", json={"amount": amount})
+
+    assert response.status_code == 422
+
+def test_amount_over_the_limit_is_rejected(client, monkeypatch):
+    monkeypatch.setattr(settings, "PAYMENT_MAX_AMOUNT", 100.0)
+
+    response = client.post("/payment/deposit", json={"amount": 100.5})
+
+    assert response.status_code == 400
+
+def test_other_routers_keep_the_default_validation_error(client):
+    response = client.post("/bets/horse", json={"horse_choice": "x", "bet_amount": 10})
+
+    assert response.status_code == 422
+    assert "input" in response.json()["detail"][0]
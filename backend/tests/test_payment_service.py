@@ -0,0 +1,211 @@
+import asyncio
+from datetime import datetime, timedelta
+import pytest
+from models.payment import PaymentWebhook
+from services import payment_service as payment_module
+from services.payment_gateway import PaymentGateway
+from services.payment_service import PaymentService
+from services.user_service import UserService
+from supabase_client.read_router import ReadRouter, RecentWrites
+from fake_supabase import FakeSupabase
+
+class StubGateway(PaymentGateway):
+    def __init__(self):
+        super().__init__()
+        self.outcome = ("ref-1", None)
+        self.submitted = []
+
+    async def submit(self, job):
+        self.submitted.append(job["id"])
+        if isinstance(self.outcome, Exception):
+            raise self.outcome
+        return self.outcome
+
+@pytest.fixture
+def db():
+    return FakeSupabase({"wallets": [{"id": "w1", "user_id": "u1", "balance": 100.0}], "payment_jobs": []})
+
+@pytest.fixture
+def service(db, monkeypatch):
+    writes = RecentWrites(window_seconds=5)
+
+    users = UserService.__new__(UserService)
+    users.supabase = db
+    users.db = ReadRouter(db, [], writes=writes)
+    monkeypatch.setattr(payment_module, "user_service", users)
+
+    service = PaymentService.__new__(PaymentService)
+    service.supabase = db
+    service.db = ReadRouter(db, [], writes=writes)
+    service.gateway = StubGateway()
+    service.gateway.webhook_handler = service.handle_webhook
+    service.queue = asyncio.Queue(maxsize=10)
+    service.workers = []
+    service._pending_credits = {}
+    return service
+
+def run(coroutine):
+    return asyncio.run(coroutine)
+
+def balance(db) -> float:
+    return db.tables["wallets"][0]["balance"]
+
+def stored(db, job) -> dict:
+    return next(row for row in db.tables["payment_jobs"] if row["id"] == job["id"])
+
+def webhook(job, status="succeeded", reference="ref-1", error=None) -> PaymentWebhook:
+    return PaymentWebhook(job_id=job["id"], reference=reference, status=status, error=error)
+
+def test_deposit_is_credited_once_confirmed(service, db):
+    job, error = run(service.create_deposit("u1", 50.0))
+    assert error is None and stored(db, job)["status"] == "queued"
+
+    run(service._process(service.queue.get_nowait()))
+    assert stored(db, job)["status"] == "awaiting_confirmation"
+    assert balance(db) == 100.0
+
+    run(service.handle_webhook(webhook(job)))
+    assert stored(db, job)["status"] == "settling"
+
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "completed"
+    assert balance(db) == 150.0
+
+def test_duplicate_webhook_credits_once(service, db):
+    job, _ = run(service.create_deposit("u1", 50.0))
+    run(service._process(service.queue.get_nowait()))
+
+    run(service.handle_webhook(webhook(job)))
+    run(service.handle_webhook(webhook(job)))
+    run(service._flush_credits())
+    run(service.handle_webhook(webhook(job)))
+    run(service._flush_credits())
+
+    assert balance(db) == 150.0
+    assert stored(db, job)["status"] == "completed"
+
+def test_webhook_with_another_reference_is_ignored(service, db):
+    job, _ = run(service.create_deposit("u1", 50.0))
+    run(service._process(service.queue.get_nowait()))
+
+    run(service.handle_webhook(webhook(job, reference="someone-else")))
+
+    assert stored(db, job)["status"] == "awaiting_confirmation"
+
+def test_job_is_only_processed_by_the_worker_that_claims_it(service, db):
+    job, _ = run(service.create_deposit("u1", 50.0))
+    queued = service.queue.get_nowait()
+    # Another pod's recovery enqueued the same job and got there first
+    run(service._process(dict(queued)))
+
+    run(service._process(queued))
+
+    assert service.gateway.submitted == [job["id"]]
+
+def test_withdrawal_reserves_then_completes(service, db):
+    job, error = run(service.create_withdrawal("u1", 30.0))
+    assert error is None and balance(db) == 70.0
+
+    run(service._process(service.queue.get_nowait()))
+    run(service.handle_webhook(webhook(job)))
+    run(service._flush_credits())
+
+    assert stored(db, job)["status"] == "completed"
+    assert balance(db) == 70.0
+
+def test_withdrawal_over_balance_is_refused(service, db):
+    job, error = run(service.create_withdrawal("u1", 300.0))
+
+    assert job is None and error == "Insufficient balance"
+    assert balance(db) == 100.0
+    assert db.tables["payment_jobs"][0]["status"] == "failed"
+
+def test_declined_withdrawal_is_refunded(service, db):
+    service.gateway.outcome = (None, "Payment declined by gateway")
+    job, _ = run(service.create_withdrawal("u1", 30.0))
+
+    run(service._process(service.queue.get_nowait()))
+    assert stored(db, job)["status"] == "refunding"
+
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "failed"
+    assert stored(db, job)["error"] == "Payment declined by gateway"
+    assert balance(db) == 100.0
+
+def test_declined_deposit_fails_without_credit(service, db):
+    service.gateway.outcome = (None, "Payment declined by gateway")
+    job, _ = run(service.create_deposit("u1", 50.0))
+
+    run(service._process(service.queue.get_nowait()))
+    run(service._flush_credits())
+
+    assert stored(db, job)["status"] == "failed"
+    assert balance(db) == 100.0
+
+def test_gateway_timeout_keeps_the_reservation(service, db):
+    service.gateway.outcome = asyncio.TimeoutError()
+    job, _ = run(service.create_withdrawal("u1", 30.0))
+
+    run(service._process(service.queue.get_nowait()))
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "unknown"
+    assert balance(db) == 70.0
+
+    # Only an explicit failure from the gateway releases the funds
+    run(service.handle_webhook(webhook(job, status="failed", error="Settlement failed")))
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "failed"
+    assert balance(db) == 100.0
+
+def test_failed_credit_is_retried_next_batch(service, db):
+    job, _ = run(service.create_deposit("u1", 50.0))
+    run(service._process(service.queue.get_nowait()))
+    run(service.handle_webhook(webhook(job)))
+
+    db.fail("wallets", "update")
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "settling"
+    assert balance(db) == 100.0
+
+    run(service._flush_credits())
+    assert stored(db, job)["status"] == "completed"
+    assert balance(db) == 150.0
+
+def test_recover_resumes_or_flags_stale_jobs(service, db):
+    stale = (datetime.utcnow() - timedelta(hours=1)).isoformat()
+    fresh = datetime.utcnow().isoformat()
+    statuses = ["queued", "processing", "pending", "settling", "refunding", "awaiting_confirmation", "unknown", "completed"]
+    db.tables["payment_jobs"] = [
+        {"id": status, "user_id": "u1", "type": "deposit", "amount": 10.0, "status": status, "reference": None, "error": None, "updated_at": stale}
+        for status in statuses
+    ]
+    db.tables["payment_jobs"].append(
+        {"id": "recent", "user_id": "u1", "type": "deposit", "amount": 10.0, "status": "unknown", "reference": None, "error": None, "updated_at": fresh}
+    )
+
+    run(service.recover())
+
+    status = {row["id"]: row["status"] for row in db.tables["payment_jobs"]}
+    assert status == {
+        "queued": "queued",
+        "processing": "unknown",
+        "pending": "needs_reconciliation",
+        "settling": "needs_reconciliation",
+        "refunding": "needs_reconciliation",
+        "awaiting_confirmation": "needs_reconciliation",
+        "unknown": "needs_reconciliation",
+        "completed": "completed",
+        "recent": "unknown",
+    }
+    assert service.queue.get_nowait()["id"] == "queued"
+    assert service.queue.empty()
+
+def test_webhook_after_reconciliation_flag_is_ignored(service, db):
+    job, _ = run(service.create_deposit("u1", 50.0))
+    run(service._process(service.queue.get_nowait()))
+    stored(db, job)["status"] = "needs_reconciliation"
+
+    run(service.handle_webhook(webhook(job)))
+    run(service._flush_credits())
+
+    assert balance(db) == 100.0
@@ -0,0 +1,70 @@
+import asyncio
+import time
+from core.profiling import SamplingProfiler
+
+def spin_profiled(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def spin_other(seconds: float):
+    end = time.perf_counter() + seconds
+    while time.perf_counter() < end:
+        pass
+
+def sampled_functions(session) -> set:
+    return {frame.split(" ")[0] for stack in session.stacks for frame in stack.split(";")}
+
+async def profiled_request(profiler: SamplingProfiler):
+    session = profiler.start()
+    for _ in range(10):
+        spin_profiled(0.01)
+        await asyncio.sleep(0.01)
+    profiler.stop(session, "/profiled")
+    return session
+
+async def other_request():
+    for _ in range(10):
+        spin_other(0.01)
+        await asyncio.sleep(0)
+
+async def idle_request(profiler: SamplingProfiler):
+    session = profiler.start()
+    await asyncio.sleep(0.1)
+    profiler.stop(session, "/idle")
+    return session
+
+def test_samples_are_attributed_to_the_running_request():
+    profiler = SamplingProfiler(interval_ms=1, buffer_size=5)
+
+    async def main():
+        session, _ = await asyncio.gather(profiled_request(profiler), other_request())
+        return session
+
+    session = asyncio.run(main())
+
+    functions = sampled_functions(session)
+    assert "spin_profiled" in functions
+    assert "spin_other" not in functions
+    assert "select" not in functions
+
+def test_idle_request_collects_no_samples():
+    profiler = SamplingProfiler(interval_ms=1, buffer_size=5)
+
+    session = asyncio.run(idle_request(profiler))
+
+    assert sum(session.stacks.values()) == 0
+    assert profiler.summary()["/idle"][0]["samples"] == 0
+
+def test_collapsed_output_merges_a_route():
+    profiler = SamplingProfiler(interval_ms=1, buffer_size=5)
+
+    async def main():
+        for _ in range(2):
+            await profiled_request(profiler)
+
+    asyncio.run(main())
+
+    collapsed = profiler.collapsed("/profiled")
+    assert "spin_profiled" in collapsed
+    assert profiler.collapsed("/missing") is None
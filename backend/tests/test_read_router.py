@@ -0,0 +1,124 @@
+import time
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from supabase_client.read_router import LAST_WRITE_COOKIE, ReadRouter, ReadYourWritesMiddleware, RecentWrites, parse_last_write, sign_last_write
+from fake_supabase import FakeSupabase
+
+def database(name: str) -> FakeSupabase:
+    return FakeSupabase({"wallets": [{"user_id": "u1", "source": name}, {"user_id": "u2", "source": name}]})
+
+def read_source(router: ReadRouter, user_id=None) -> str:
+    return router.read(lambda client: client.table("wallets").select("*").eq("user_id", user_id or "u1"), user_id=user_id).data[0]["source"]
+
+@pytest.fixture
+def primary():
+    return database("primary")
+
+@pytest.fixture
+def replicas():
+    return [database("replica-0"), database("replica-1")]
+
+def test_reads_round_robin_over_replicas(primary, replicas):
+    router = ReadRouter(primary, replicas, writes=RecentWrites(window_seconds=5))
+
+    assert [read_source(router) for _ in range(4)] == ["replica-0", "replica-1", "replica-0", "replica-1"]
+    assert primary.calls == []
+
+def test_failing_replica_falls_back_to_primary_and_leaves_rotation(primary, replicas):
+    router = ReadRouter(primary, replicas, writes=RecentWrites(window_seconds=5), retry_seconds=60)
+    replicas[0].fail("wallets", "select")
+
+    assert read_source(router) == "primary"
+    assert [read_source(router) for _ in range(3)] == ["replica-1"] * 3
+
+def test_replica_returns_after_retry_period(primary, replicas):
+    router = ReadRouter(primary, replicas[:1], writes=RecentWrites(window_seconds=5), retry_seconds=0.05)
+    replicas[0].fail("wallets", "select")
+
+    assert read_source(router) == "primary"
+    assert read_source(router) == "primary"
+    time.sleep(0.06)
+    assert read_source(router) == "replica-0"
+
+def test_no_replicas_reads_primary(primary):
+    router = ReadRouter(primary, [], writes=RecentWrites(window_seconds=5))
+
+    assert read_source(router) == "primary"
+
+def test_writer_reads_stick_to_primary_for_the_window(primary, replicas):
+    router = ReadRouter(primary, replicas, writes=RecentWrites(window_seconds=0.05))
+
+    router.write(lambda client: client.table("wallets").update({"balance": 1}).eq("user_id", "u1"), user_id="u1")
+
+    assert read_source(router, "u1") == "primary"
+    assert read_source(router, "u2").startswith("replica")
+    time.sleep(0.06)
+    assert read_source(router, "u1").startswith("replica")
+
+def test_failed_write_still_pins_reads(primary, replicas):
+    router = ReadRouter(primary, replicas, writes=RecentWrites(window_seconds=5))
+    primary.fail("wallets", "update")
+
+    with pytest.raises(RuntimeError):
+        router.write(lambda client: client.table("wallets").update({"balance": 1}).eq("user_id", "u1"), user_id="u1")
+
+    assert read_source(router, "u1") == "primary"
+
+def make_pod(primary, replicas) -> TestClient:
+    """An app with its own RecentWrites, as a separate pod would have"""
+    router = ReadRouter(primary, replicas, writes=RecentWrites(window_seconds=5))
+    app = FastAPI()
+
+    @app.post("/write/{user_id}")
+    async def write(user_id: str):
+        router.write(lambda client: client.table("wallets").update({"balance": 1}).eq("user_id", user_id), user_id=user_id)
+        return {}
+
+    @app.get("/read/{user_id}")
+    async def read(user_id: str):
+        return {"source": read_source(router, user_id)}
+
+    app.add_middleware(ReadYourWritesMiddleware, window_seconds=5)
+    return TestClient(app)
+
+def test_marker_carries_stickiness_to_another_pod(primary, replicas):
+    pod_a, pod_b = make_pod(primary, replicas), make_pod(primary, replicas)
+
+    response = pod_a.post("/write/u1")
+    marker = response.headers["x-last-write"]
+    assert f"{LAST_WRITE_COOKIE}={marker}" in response.headers["set-cookie"]
+
+    assert pod_b.get("/read/u1", headers={"X-Last-Write": marker}).json()["source"] == "primary"
+    assert pod_b.get("/read/u1", headers={"Cookie": f"{LAST_WRITE_COOKIE}={marker}"}).json()["source"] == "primary"
+    assert pod_b.get("/read/u1").json()["source"].startswith("replica")
+
+def test_marker_does_not_apply_to_another_user(primary, replicas):
+    pod_a, pod_b = make_pod(primary, replicas), make_pod(primary, replicas)
+    marker = pod_a.post("/write/u1").headers["x-last-write"]
+
+    assert pod_b.get("/read/u2", headers={"X-Last-Write": marker}).json()["source"].startswith("replica")
+
+@pytest.mark.parametrize("marker", [
+    f"{time.time():.3f}",  # Unsigned
+    f"{time.time():.3f}.{'0' * 64}",  # Forged signature
+    "garbage",
+    "nan.abc",
+    "t\xe9k",
+])
+def test_unsigned_or_forged_marker_is_ignored(primary, replicas, marker):
+    pod = make_pod(primary, replicas)
+
+    response = pod.get("/read/u1", headers={"X-Last-Write": marker.encode("latin-1")})
+
+    assert response.json()["source"].startswith("replica")
+
+def test_resent_marker_expires(primary, replicas):
+    pod = make_pod(primary, replicas)
+    stale = sign_last_write("u1", time.time() - 10)
+
+    assert pod.get("/read/u1", headers={"X-Last-Write": stale}).json()["source"].startswith("replica")
+
+def test_future_marker_is_rejected():
+    assert parse_last_write(sign_last_write("u1", time.time() + 3600)) is None
+    assert parse_last_write(sign_last_write("u1", time.time()))[1]
@@ -0,0 +1,89 @@
+import asyncio
+import pytest
+from services.settlement_queue import SettlementQueue
+
+def test_items_for_a_key_are_batched_in_arrival_order():
+    calls = []
+
+    async def handler(key, items):
+        calls.append((key, list(items)))
+        return [f"{key}:{item}" for item in items]
+
+    async def main():
+        queue = SettlementQueue(handler, shards=4, window_ms=20, max_batch=100)
+        submissions = [queue.submit(key, index) for index in range(5) for key in ("a", "b")]
+        results = await asyncio.gather(*submissions)
+        await queue.stop()
+        return results
+
+    results = asyncio.run(main())
+
+    assert results == [f"{key}:{index}" for index in range(5) for key in ("a", "b")]
+    assert sorted(calls) == [("a", [0, 1, 2, 3, 4]), ("b", [0, 1, 2, 3, 4])]
+
+def test_batches_are_capped_at_max_batch():
+    sizes = []
+
+    async def handler(key, items):
+        sizes.append(len(items))
+        return list(items)
+
+    async def main():
+        queue = SettlementQueue(handler, shards=1, window_ms=20, max_batch=3)
+        results = await asyncio.gather(*(queue.submit("a", index) for index in range(7)))
+        await queue.stop()
+        return results
+
+    assert asyncio.run(main()) == list(range(7))
+    assert sizes == [3, 3, 1]
+
+def test_handler_error_fails_the_whole_batch_for_that_key():
+    async def handler(key, items):
+        if key == "bad":
+            raise RuntimeError("database down")
+        return list(items)
+
+    async def main():
+        queue = SettlementQueue(handler, shards=1, window_ms=20, max_batch=100)
+        results = await asyncio.gather(
+            queue.submit("bad", 1), queue.submit("good", 2), queue.submit("bad", 3),
+            return_exceptions=True
+        )
+        await queue.stop()
+        return results
+
+    bad_first, good, bad_second = asyncio.run(main())
+
+    assert good == 2
+    assert str(bad_first) == str(bad_second) == "database down"
+
+def test_stop_finishes_the_batch_in_progress_and_rejects_queued_items():
+    async def main():
+        started = asyncio.Event()
+        release = asyncio.Event()
+
+        async def handler(key, items):
+            started.set()
+            await release.wait()
+            return list(items)
+
+        queue = SettlementQueue(handler, shards=1, window_ms=0, max_batch=1)
+        in_progress = asyncio.ensure_future(queue.submit("a", 1))
+        await started.wait()
+        queued = [asyncio.ensure_future(queue.submit("a", index)) for index in (2, 3)]
+        await asyncio.sleep(0)
+
+        stopping = asyncio.ensure_future(queue.stop())
+        await asyncio.sleep(0.01)
+        release.set()
+        await stopping
+
+        with pytest.raises(RuntimeError, match="shutting down"):
+            await queue.submit("a", 4)
+
+        return await asyncio.gather(in_progress, *queued, return_exceptions=True)
+
+    first, *rejected = asyncio.run(main())
+
+    assert first == 1
+    assert all(isinstance(error, RuntimeError) for error in rejected)
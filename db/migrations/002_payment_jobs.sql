@@ -0,0 +1,22 @@
+-- Payment Jobs Table (deposit/withdrawal pipeline state, shared by all backend pods)
+CREATE TABLE IF NOT EXISTS payment_jobs (
+    id UUID PRIMARY KEY DEFAULT uuid_generate_v4(),
+    user_id UUID NOT NULL REFERENCES users(id) ON DELETE CASCADE,
+    type VARCHAR(20) NOT NULL CHECK (type IN ('deposit', 'withdrawal')),
+    amount DECIMAL(15, 2) NOT NULL CHECK (amount > 0),
+    status VARCHAR(30) NOT NULL CHECK (status IN (
+        'pending', 'queued', 'processing', 'awaiting_confirmation', 'unknown',
+        'settling', 'refunding', 'completed', 'failed', 'needs_reconciliation'
+    )),
+    reference VARCHAR(255),
+    error TEXT,
+    created_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP,
+    updated_at TIMESTAMP WITH TIME ZONE DEFAULT CURRENT_TIMESTAMP
+);
+
+-- Create indexes for status polling and startup recovery
+CREATE INDEX idx_payment_jobs_user_id ON payment_jobs(user_id);
+CREATE INDEX idx_payment_jobs_status_updated_at ON payment_jobs(status, updated_at);
+
+CREATE TRIGGER update_payment_jobs_updated_at BEFORE UPDATE ON payment_jobs
+    FOR EACH ROW EXECUTE FUNCTION update_updated_at_column();